@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: latin-1 -*- ######################################################
+#                                                                              #
+# startup.py - measure how long wordlistctl takes to start: catalog loading   #
+# with and without the compiled cache, and wall time and third-party imports  #
+# of each subcommand.                                                          #
+#                                                                              #
+################################################################################
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+__root__ = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+__script__ = os.path.join(__root__, 'wordlistctl.py')
+__runs__ = 20
+__commands__ = [['-V'], ['-H'], ['-c', '?'], ['-F', 'password'], ['-S', 'rockyou'], ['-f', '?']]
+__modules__ = ['requests', 'urllib3', 'libtorrent', 'libarchive', 'rarfile', 'aiohttp', 'asyncio']
+
+sys.path.insert(0, __root__)
+import wordlistctl
+
+
+def timeit(func, runs=__runs__):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def load_json():
+    wordlistctl.__urls__ = wordlistctl.load_json(wordlistctl.__urls_file_name__)
+    wordlistctl.__categories__ = wordlistctl.load_json(wordlistctl.__categories_file_name__)
+    wordlistctl.build_index()
+
+
+def load_cache(urls):
+    def load():
+        if not wordlistctl.load_cache(urls):
+            raise RuntimeError('catalog cache is stale')
+    return load
+
+
+def drop_cache():
+    try:
+        os.remove(wordlistctl.__cache_file_name__)
+    except FileNotFoundError:
+        pass
+
+
+def run_cli(args, cold):
+    def run():
+        if cold:
+            drop_cache()
+        subprocess.run([sys.executable, __script__] + args, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=True)
+    return run
+
+
+def imported_modules(args):
+    proc = subprocess.run([sys.executable, '-X', 'importtime', __script__] + args, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, universal_newlines=True)
+    names = set()
+    for line in proc.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            names.add(line.split('|')[-1].strip().split('.')[0])
+    return [i for i in __modules__ if i in names]
+
+
+def main():
+    wordlistctl.__urls_file_name__ = os.path.join(__root__, 'urls.json')
+    wordlistctl.__categories_file_name__ = os.path.join(__root__, 'categories.json')
+    wordlistctl.__cache_file_name__ = os.path.join(__root__, 'catalog.cache')
+
+    load_json()
+    wordlistctl.save_cache()
+    print("in-process catalog load (median of {0} runs)".format(__runs__))
+    print("  json:               {0:8.2f} ms".format(timeit(load_json)))
+    print("  cache (index only): {0:8.2f} ms".format(timeit(load_cache(False))))
+    print("  cache (with urls):  {0:8.2f} ms".format(timeit(load_cache(True))))
+
+    print("end-to-end invocation (median of {0} runs)".format(__runs__))
+    for args in [['-S', 'rockyou'], ['-F', 'password'], ['-f', '?']]:
+        cold = timeit(run_cli(args, True))
+        warm = timeit(run_cli(args, False))
+        print("  {0:16} json: {1:8.2f} ms  cache: {2:8.2f} ms".format(' '.join(args), cold, warm))
+
+    print("subcommands (median of {0} runs)".format(__runs__))
+    for args in __commands__:
+        print("  {0:16} {1:8.2f} ms  third-party imports: {2}".format(
+            ' '.join(args), timeit(run_cli(args, False)), ', '.join(imported_modules(args)) or '-'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
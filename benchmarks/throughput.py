@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: latin-1 -*- ######################################################
+#                                                                              #
+# throughput.py - measure download and extraction throughput of wordlistctl   #
+# against a local http server serving generated wordlists and archives, with  #
+# optional latency and failure injection.                                      #
+#                                                                              #
+################################################################################
+
+import bz2
+import getopt
+import gzip
+import http.server
+import io
+import json
+import lzma
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+
+__root__ = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+__script__ = os.path.join(__root__, 'wordlistctl.py')
+__size__ = 8
+__latency__ = 0
+__failures__ = 0.0
+__threads__ = [1, 4, 8]
+__async__ = [0]
+__segments__ = [1]
+__runs__ = 1
+__extract__ = True
+__output__ = ''
+__seed__ = 1337
+
+
+def usage():
+    __usage__ = "usage:\n\n"
+    __usage__ += "  {0} [options]\n\n".format(os.path.basename(sys.argv[0]))
+    __usage__ += "options:\n\n"
+    __usage__ += "  -s <num>   - size of each generated wordlist in MiB (default: {0})\n".format(__size__)
+    __usage__ += "  -l <num>   - latency added to each request in ms (default: {0})\n".format(__latency__)
+    __usage__ += "  -e <num>   - probability of a failed or truncated response (default: {0})\n".format(__failures__)
+    __usage__ += "  -t <list>  - comma separated -t values to benchmark (default: {0})\n".format(
+        ','.join([str(i) for i in __threads__]))
+    __usage__ += "  -a <list>  - comma separated -a values to benchmark, 0 for threads (default: {0})\n".format(
+        ','.join([str(i) for i in __async__]))
+    __usage__ += "  -j <list>  - comma separated -j values to benchmark (default: {0})\n".format(
+        ','.join([str(i) for i in __segments__]))
+    __usage__ += "  -r <num>   - runs per combination of -t, -a and -j values (default: {0})\n".format(__runs__)
+    __usage__ += "  -n         - download only, do not pass -X\n"
+    __usage__ += "  -o <file>  - append results as json lines to <file>\n"
+    __usage__ += "  -h         - print this help and exit\n"
+    print(__usage__)
+
+
+def wordlist(size):
+    rnd = random.Random(__seed__)
+    lines = []
+    total = 0
+    while total < size:
+        line = '{0}{1:07d}\n'.format(''.join(rnd.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(6)),
+                                      rnd.randrange(10000000))
+        lines.append(line)
+        total += line.__len__()
+    return ''.join(lines).encode()
+
+
+def add_file(path, data):
+    with open(path, 'wb') as fp:
+        fp.write(data)
+
+
+def add_zip(path, data):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('zip.txt', data)
+
+
+def add_tar(path, mode, data):
+    with tarfile.open(path, mode) as tar:
+        info = tarfile.TarInfo('tar.txt')
+        info.size = data.__len__()
+        info.mtime = time.time()
+        tar.addfile(info, io.BytesIO(data))
+
+
+def add_7z(path, data):
+    import libarchive
+    with libarchive.file_writer(path, '7zip') as archive:
+        archive.add_file_from_memory('7z.txt', data.__len__(), data)
+
+
+def fixtures(directory, size):
+    data = wordlist(size)
+    files = {'plain.txt': lambda p: add_file(p, data),
+             'gz.txt.gz': lambda p: add_file(p, gzip.compress(data, 6)),
+             'bz2.txt.bz2': lambda p: add_file(p, bz2.compress(data, 9)),
+             'xz.txt.xz': lambda p: add_file(p, lzma.compress(data, preset=6)),
+             'zip.zip': lambda p: add_zip(p, data),
+             'tgz.tar.gz': lambda p: add_tar(p, 'w:gz', data),
+             'tbz.tar.bz2': lambda p: add_tar(p, 'w:bz2', data),
+             'txz.tar.xz': lambda p: add_tar(p, 'w:xz', data),
+             '7z.7z': lambda p: add_7z(p, data)}
+    created = []
+    for name, create in files.items():
+        try:
+            create(os.path.join(directory, name))
+            created.append(name)
+        except ImportError as ex:
+            print("  skipping {0}: {1}".format(name, str(ex)))
+    return created
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    directory = ''
+    latency = 0
+    failures = 0.0
+    random = random.Random(__seed__)
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.respond(False)
+
+    def do_GET(self):
+        self.respond(True)
+
+    def respond(self, body):
+        time.sleep(self.latency / 1000.0)
+        path = os.path.join(self.directory, os.path.basename(self.path))
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        failure = body and self.random.random() < self.failures
+        if failure and self.random.random() < 0.5:
+            self.send_error(503)
+            return
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', 'bytes */{0}'.format(size))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {0}-{1}/{2}'.format(start, end, size))
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', '"{0:x}-{1:x}"'.format(size, int(os.path.getmtime(path))))
+        self.end_headers()
+        if not body:
+            return
+        remaining = end - start + 1
+        if failure:
+            remaining //= 2
+        with open(path, 'rb') as fp:
+            fp.seek(start)
+            while remaining > 0:
+                block = fp.read(min(remaining, 64 * 1024))
+                if not block:
+                    break
+                self.wfile.write(block)
+                remaining -= block.__len__()
+        if failure:
+            self.close_connection = True
+
+
+def serve(directory):
+    Handler.directory = directory
+    Handler.latency = __latency__
+    Handler.failures = __failures__
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def catalog(directory, files, port):
+    urls = {}
+    for name in files:
+        urls[name.split('.')[0]] = {'http': 'http://127.0.0.1:{0}/{1}'.format(port, name), 'torrent': ''}
+    with open(os.path.join(directory, 'urls.json'), 'w') as fp:
+        json.dump(urls, fp)
+    with open(os.path.join(directory, 'categories.json'), 'w') as fp:
+        json.dump({'bench': list(urls.keys())}, fp)
+    shutil.copy(__script__, os.path.join(directory, 'wordlistctl.py'))
+
+
+def percentile(samples, pct):
+    if samples.__len__() <= 0:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(samples.__len__() - 1, int(round(pct / 100.0 * (samples.__len__() - 1))))]
+
+
+def run(directory, threads, engine, segments):
+    output = os.path.join(directory, 'out')
+    metrics = os.path.join(directory, 'metrics.jsonl')
+    shutil.rmtree(output, ignore_errors=True)
+    if os.path.isfile(metrics):
+        os.remove(metrics)
+    args = [sys.executable, os.path.join(directory, 'wordlistctl.py'), '-f', '0', '-d', output,
+            '-t', str(threads), '-j', str(segments), '-m', metrics] + (['-X'] if __extract__ else []) + \
+        (['-a', str(engine)] if engine > 0 else [])
+    start = time.perf_counter()
+    proc = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - start
+    events = []
+    with open(metrics, 'r') as fp:
+        for line in fp:
+            events.append(json.loads(line))
+    downloads = [i for i in events if i['event'] == 'download']
+    received = sum([i['bytes'] for i in downloads])
+    latencies = [i['seconds'] * 1000 for i in downloads]
+    return {'threads': threads, 'async': engine, 'segments': segments, 'size': __size__, 'latency': __latency__,
+            'failures': __failures__, 'extract': __extract__, 'status': proc.returncode, 'seconds': round(elapsed, 3),
+            'bytes': received, 'throughput': round(received / elapsed / 1024 / 1024, 2),
+            'p50': round(percentile(latencies, 50), 1), 'p90': round(percentile(latencies, 90), 1),
+            'p99': round(percentile(latencies, 99), 1),
+            'decompress': round(sum([i['seconds'] for i in events if i['event'] == 'decompress']), 3),
+            'retries': sum([i.get('retries', 0) for i in downloads]),
+            'failed': [i['result'] for i in downloads].count(-1),
+            'cpu': round(usage.ru_utime + usage.ru_stime, 3), 'rss': usage.ru_maxrss // 1024}
+
+
+def arg_parse(argv):
+    global __size__
+    global __latency__
+    global __failures__
+    global __threads__
+    global __async__
+    global __segments__
+    global __runs__
+    global __extract__
+    global __output__
+    try:
+        opts, _ = getopt.getopt(argv[1:], "hns:l:e:t:a:j:r:o:")
+        for opt, arg in opts:
+            if opt == '-h':
+                usage()
+                sys.exit(0)
+            elif opt == '-n':
+                __extract__ = False
+            elif opt == '-s':
+                __size__ = int(arg)
+            elif opt == '-l':
+                __latency__ = int(arg)
+            elif opt == '-e':
+                __failures__ = float(arg)
+            elif opt == '-t':
+                __threads__ = [int(i) for i in arg.split(',')]
+            elif opt == '-a':
+                __async__ = [int(i) for i in arg.split(',')]
+            elif opt == '-j':
+                __segments__ = [int(i) for i in arg.split(',')]
+            elif opt == '-r':
+                __runs__ = int(arg)
+            elif opt == '-o':
+                __output__ = arg
+    except (getopt.GetoptError, ValueError) as ex:
+        print("error: {0}".format(str(ex)))
+        sys.exit(-1)
+
+
+def main(argv):
+    arg_parse(argv)
+    directory = tempfile.mkdtemp(prefix='wordlistctl-bench-')
+    try:
+        served = os.path.join(directory, 'srv')
+        os.makedirs(served)
+        print("generating {0} MiB fixtures in {1}".format(__size__, served))
+        files = fixtures(served, __size__ * 1024 * 1024)
+        server = serve(served)
+        catalog(directory, files, server.server_address[1])
+        print("{0} files, latency {1} ms, failure rate {2}, extract {3}\n".format(
+            files.__len__(), __latency__, __failures__, 'yes' if __extract__ else 'no'))
+        print("  {0:>3} {1:>3} {2:>3} {3:>8} {4:>10} {5:>8} {6:>8} {7:>8} {8:>10} {9:>8} {10:>7} {11:>8} "
+              "{12:>8}".format(
+            '-t', '-a', '-j', 'wall s', 'MiB/s', 'p50 ms', 'p90 ms', 'p99 ms', 'unpack s', 'cpu s', 'retries',
+            'failed', 'rss MiB'))
+        for threads in __threads__:
+            for engine in __async__:
+                for segments in __segments__:
+                    for _ in range(__runs__):
+                        result = run(directory, threads, engine, segments)
+                        print("  {threads:>3} {async:>3} {segments:>3} {seconds:>8.2f} {throughput:>10.2f} "
+                              "{p50:>8.1f} {p90:>8.1f} {p99:>8.1f} {decompress:>10.2f} {cpu:>8.2f} {retries:>7} "
+                              "{failed:>8} {rss:>8}".format(**result))
+                        if __output__ != '':
+                            with open(__output__, 'a') as fp:
+                                fp.write("{0}\n".format(json.dumps(dict(result, time=round(time.time())))))
+        server.shutdown()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
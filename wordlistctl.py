@@ -13,6 +13,19 @@
 #                                                                              #
 ################################################################################
 
+import sys
+import os
+import getopt
+import re
+import threading
+import queue
+import time
+import json
+import marshal
+import struct
+import hashlib
+from termcolor import colored
+
 __author__ = 'Sepehrdad Sh'
 __organization__ = 'blackarch.org'
 __license__ = 'GPLv3'
@@ -22,16 +35,79 @@ __project__ = 'wordlistctl'
 __wordlist_path__ = '/usr/share/wordlists'
 __urls_file_name__ = ''
 __categories_file_name__ = ''
+__cache_file_name__ = ''
+__state_file_name__ = ''
+__resolve_file_name__ = ''
+__resolved__ = None
+__resolve_ttl__ = 6 * 3600
+__sizes_file_name__ = ''
+__sizes__ = None
+__sizes_ttl__ = 7 * 24 * 3600
+__unpack_ratio__ = 4
+__config_url__ = 'https://raw.githubusercontent.com/BlackArch/wordlistctl/master'
+__fetch_changed__ = False
+__cache_version__ = 2
 __category__ = ''
 __urls__ = {}
 __categories__ = {}
+__index__ = {}
+__manifest__ = {}
+__install_filter__ = ''
+__fuzzy__ = 0.5
+__index_contents__ = False
+__bloom_hashes__ = 4
+__bloom_bits__ = 12
+__bloom_prefixes__ = [1, 2, 3, 4, 6, 8]
+__sort_chunk__ = 16 * 1024 * 1024
+__merge_fanin__ = 64
+__stats_sketch__ = 65536
 __decompress__ = False
 __remove__ = False
 __prefer_http__ = False
 
+__chunk_size__ = 1024 * 1024
+__segments__ = 1
+__segment_size__ = 4 * 1024 * 1024
+__timeout__ = 60
+__retries__ = 3
+__backoff__ = 1
+
 __trds__ = []
 __max_trds__ = 10
+__max_procs__ = os.cpu_count() or 1
+__unpacker__ = None
+__unpacks__ = []
+__async__ = 0
+__async_jobs__ = []
+__jobs__ = None
+__results__ = []
+__cancel__ = None
+__lock__ = threading.RLock()
 __session__ = None
+__torrents__ = {}
+__progress__ = False
+__progress_done__ = None
+__metrics_file__ = ''
+__metrics__ = {}
+__mirror_url__ = ''
+__serve__ = ''
+__torrent_cv__ = None
+__torrent_thread__ = None
+__rate_limit__ = 0
+__write_limit__ = 0
+__buckets__ = {}
+__torrent_connections__ = 200
+__keep_torrents__ = False
+__api_lock__ = threading.Lock()
+__api_owner__ = None
+__api_defaults__ = None
+__api_instances__ = 0
+__api_stamps__ = None
+__options__ = ['__wordlist_path__', '__category__', '__decompress__', '__remove__', '__prefer_http__', '__max_trds__',
+               '__chunk_size__', '__segments__', '__async__', '__max_procs__', '__rate_limit__', '__write_limit__',
+               '__progress__', '__metrics_file__', '__mirror_url__', '__install_filter__', '__serve__',
+               '__fetch_changed__', '__index_contents__']
+__http__ = None
 __useragent__ = 'Mozilla/5.0 (Windows NT 10.0; WOW64; rv:63.0) Gecko/20180101 Firefox/63.0'
 
 
@@ -59,15 +135,33 @@ def usage():
     __usage__ += "  -f <num>   - download chosen wordlist - ? to list wordlists with id\n"
     __usage__ += "  -d <dir>   - wordlists base directory (default: {1})\n"
     __usage__ += "  -c <num>   - change wordlists category - ? to list wordlists categories\n"
-    __usage__ += "  -s <regex> - wordlist to search using <regex> in base directory\n"
-    __usage__ += "  -S <regex> - wordlist to search using <regex> in sites\n"
+    __usage__ += "  -s <regex> - wordlist to search using <regex>, glob or fuzzy match in base directory\n"
+    __usage__ += "  -S <regex> - wordlist to search using <regex>, substring or fuzzy match in sites\n"
+    __usage__ += "  -l <state> - with -S, only show installed or missing wordlists\n"
+    __usage__ += "  -w <word>  - search installed wordlists containing <word> (<word>* for prefix, indexed up to 8 bytes)\n"
+    __usage__ += "  -I         - index wordlist contents after install for -w\n"
+    __usage__ += "  -M <file>  - merge, dedupe and sort installed wordlists into <file>\n"
+    __usage__ += "  -i         - print statistics of installed wordlists\n"
+    __usage__ += "  -v         - verify installed wordlists and refetch corrupt ones\n"
     __usage__ += "  -h         - prefer http\n"
     __usage__ += "  -X         - decompress wordlist\n"
     __usage__ += "  -F <str>   - list wordlists in categories given\n"
     __usage__ += "  -r         - remove compressed file after decompression\n"
-    __usage__ += "  -t <num>   - max download threads (default: {0})\n\n".format(__max_trds__)
+    __usage__ += "  -t <num>   - max download threads (default: {0})\n".format(__max_trds__)
+    __usage__ += "  -b <num>   - download chunk size in KiB (default: {0})\n".format(__chunk_size__ // 1024)
+    __usage__ += "  -j <num>   - max connections per file for segmented download (default: {0})\n".format(__segments__)
+    __usage__ += "  -a <num>   - use asyncio http engine with <num> connections per host\n"
+    __usage__ += "  -p <num>   - max decompression processes (default: number of cpus)\n"
+    __usage__ += "  -L <num>   - download rate limit in KiB/s (default: unlimited)\n"
+    __usage__ += "  -W <num>   - disk write rate limit in KiB/s (default: unlimited)\n"
+    __usage__ += "  -P         - show live download progress\n"
+    __usage__ += "  -m <file>  - append per-job metrics as json lines to <file>\n"
+    __usage__ += "  -R <url>   - download from wordlistctl mirror at <url>, falling back to upstream\n"
+    __usage__ += "  -E <addr>  - serve installed wordlists as a mirror on [host:]port (after -f if given)\n"
+    __usage__ += "  -D <path>  - run as a daemon accepting json jobs on unix socket <path>\n\n"
     __usage__ += "misc:\n\n"
     __usage__ += "  -U         - update config files\n"
+    __usage__ += "  -u         - with -U, refetch installed wordlists whose urls changed\n"
     __usage__ += "  -V         - print version of wordlistctl and exit\n"
     __usage__ += "  -H         - print this help and exit\n\n"
     __usage__ += "example:\n\n"
@@ -81,8 +175,26 @@ def usage():
     __usage__ += "  $ wordlistctl -f 0 -c 4 -X\n\n"
     __usage__ += "  # download all wordlists in filename category using 20 threads\n"
     __usage__ += "  $ wordlistctl -c 3 -f 0 -t 20\n\n"
+    __usage__ += "  # download all wordlists using 200 concurrent transfers, 8 per host\n"
+    __usage__ += "  $ wordlistctl -f 0 -t 200 -a 8\n\n"
+    __usage__ += "  # download wordlist with id 2 using 8 connections\n"
+    __usage__ += "  $ wordlistctl -f 2 -j 8\n\n"
     __usage__ += "  # download wordlist with id 2 to \"~/wordlists\" directory using http\n"
     __usage__ += "  $ wordlistctl -f 2 -d ~/wordlists -h\n\n"
+    __usage__ += "  # find installed password wordlists containing \"hunter2\"\n"
+    __usage__ += "  $ wordlistctl -w hunter2 -c 1\n\n"
+    __usage__ += "  # merge all installed password wordlists into one sorted unique list\n"
+    __usage__ += "  $ wordlistctl -c 1 -M passwords.txt\n\n"
+    __usage__ += "  # print statistics of installed password wordlists\n"
+    __usage__ += "  $ wordlistctl -c 1 -i\n\n"
+    __usage__ += "  # download all wordlists and serve them to other nodes on port 8080\n"
+    __usage__ += "  $ wordlistctl -f 0 -E 8080\n\n"
+    __usage__ += "  # install from a mirror, falling back to upstream urls\n"
+    __usage__ += "  $ wordlistctl -f 0 -X -R http://mirror:8080\n\n"
+    __usage__ += "  # download and decompress all wordlists at 2 MiB/s, writing at most 8 MiB/s\n"
+    __usage__ += "  $ wordlistctl -f 0 -X -L 2048 -W 8192\n\n"
+    __usage__ += "  # keep the catalog and sessions warm and queue jobs over a unix socket\n"
+    __usage__ += "  $ wordlistctl -D /run/wordlistctl.sock\n\n"
     __usage__ += "  # print wordlists in username and password categories\n"
     __usage__ += "  $ wordlistctl -F username,password\n"
 
@@ -100,13 +212,34 @@ def banner():
     print(colored(__str_banner__, 'red', attrs=['bold']))
 
 
+def write_blocks(blocks, path):
+    part = "{0}.part".format(path)
+    hasher = hashlib.sha256()
+    try:
+        with open(part, 'wb') as outfile:
+            for block in blocks:
+                outfile.write(block)
+                hasher.update(block)
+                pause(throttle(written=block.__len__()))
+        os.replace(part, path)
+        return hasher.hexdigest()
+    except BaseException:
+        if os.path.isfile(part):
+            os.remove(part)
+        raise
+
+
 def decompress_gbl(infilename):
+    import gzip
+    import bz2
+    import lzma
     filename = os.path.basename(infilename)
     try:
         infile = None
         __outfile__ = os.path.splitext(infilename)[0]
         if os.path.isfile(__outfile__):
             warn("{0} already exists -- skipping".format(os.path.basename(__outfile__)))
+            return {__outfile__: file_digest(__outfile__)}
         else:
             if re.fullmatch(r"^.*\.(gz)$", infilename.lower()):
                 infile = gzip.GzipFile(infilename, 'rb')
@@ -117,40 +250,62 @@ def decompress_gbl(infilename):
             else:
                 raise ValueError('unknown file type')
             info("decompressing {0}".format(filename))
-            outfile = open(__outfile__, 'wb')
-            copyfileobj(infile, outfile)
-            outfile.close()
+            with infile:
+                digest = write_blocks(iter(lambda: infile.read(__chunk_size__), b''), __outfile__)
             success("decompressing {0} completed".format(filename))
+            return {__outfile__: digest}
     except Exception as ex:
         err('Error while decompressing {0}'.format(filename), str(ex))
         return -1
 
 
+def extract_path(directory, name):
+    path = os.path.realpath(os.path.join(directory, name))
+    if os.path.commonpath([directory, path]) != directory:
+        raise ValueError('{0} points outside of {1}'.format(name, directory))
+    return path
+
+
 def decompress_archive(infilename):
     filename = os.path.basename(infilename)
+    directory = os.path.dirname(os.path.realpath(infilename))
+    outputs = {}
     try:
-        os.chdir(os.path.dirname(infilename))
         info("decompressing {0}".format(filename))
         if re.fullmatch(r"^.*\.(rar)$", filename.lower()):
-            infile = rarfile.RarFile(infilename)
-            infile.extractall()
+            import rarfile
+            with rarfile.RarFile(infilename) as infile:
+                for i in infile.infolist():
+                    path = extract_path(directory, i.filename)
+                    if i.is_dir():
+                        os.makedirs(path, exist_ok=True)
+                    else:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        with infile.open(i) as entry:
+                            outputs[path] = write_blocks(iter(lambda: entry.read(__chunk_size__), b''), path)
         else:
-            libarchive.extract_file(infilename)
+            import libarchive
+            with libarchive.file_reader(infilename) as infile:
+                for entry in infile:
+                    path = extract_path(directory, entry.pathname)
+                    if entry.isdir:
+                        os.makedirs(path, exist_ok=True)
+                    elif entry.isreg:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        outputs[path] = write_blocks(entry.get_blocks(), path)
         success("decompressing {0} completed".format(filename))
+        return outputs
     except Exception as ex:
         err('Error while decompressing {0}'.format(filename), str(ex))
         return -1
 
 
-def decompress(infilename):
+def decompress_file(infilename):
     filename = os.path.basename(infilename)
-
-    if (not __decompress__) or (infilename.endswith('.torrent')):
-        return
     try:
         if re.fullmatch(r"^.*\.(rar|zip|7z|tar|tar.gz|tar.xz|tar.bz2)$", filename.lower()):
             return decompress_archive(infilename)
-        elif re.fullmatch(r"^.*\.(gz|bz|bz2|lzma)$", filename.lower()):
+        elif re.fullmatch(r"^.*\.(gz|bz|bz2|lzma|xz)$", filename.lower()):
             return decompress_gbl(infilename)
         else:
             return -1
@@ -159,6 +314,107 @@ def decompress(infilename):
         return -1
 
 
+def stage_file(infilename, extract, index_dir):
+    outputs = [infilename]
+    if extract:
+        outputs = decompress_file(infilename)
+        if outputs == -1:
+            return -1
+    if index_dir != '':
+        for i in outputs:
+            if indexable(i):
+                index_file(i, index_dir)
+    return outputs
+
+
+def queue_decompress(infilename, name=''):
+    global __unpacker__
+    filename = os.path.basename(infilename).lower()
+    if not os.path.isfile(infilename):
+        return
+    extract = __decompress__ and re.fullmatch(r"^.*\.(rar|zip|7z|tar|gz|bz|bz2|lzma|xz)$", filename) is not None \
+        and installed_outputs(name, infilename).__len__() <= 0
+    index_dir = index_path() if __index_contents__ and (extract or indexable(infilename)) else ''
+    if not extract and index_dir == '':
+        return
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    bucket = token_bucket('disk') if __write_limit__ > 0 else None
+    with __lock__:
+        if __unpacker__ is None:
+            __unpacker__ = ProcessPoolExecutor(__max_procs__, multiprocessing.get_context('spawn'),
+                                               initializer=init_stage, initargs=(__write_limit__, bucket))
+        future = __unpacker__.submit(timed, stage_file, infilename, extract, index_dir)
+        __unpacks__.append((infilename, future))
+    future.add_done_callback(lambda f: f.cancelled() or f.exception() or staged(name, infilename, extract, *f.result()))
+
+
+def staged(name, infilename, extract, seconds, outputs):
+    record_metric('decompress' if extract else 'index', infilename, name=name, seconds=seconds,
+                  result=-1 if outputs == -1 else 0)
+    if extract and outputs != -1:
+        record_outputs(name, infilename, outputs)
+        if __remove__:
+            __start__ = time.time()
+            clean(infilename)
+            record_metric('clean', infilename, name=name, seconds=time.time() - __start__)
+
+
+def join_decompress(cancel=False):
+    global __unpacker__
+    global __unpacks__
+    if __unpacker__ is None:
+        return
+    __unpacker__.shutdown(wait=True, cancel_futures=cancel)
+    for infilename, future in __unpacks__:
+        result = None
+        if not future.cancelled():
+            result = -1 if future.exception() or future.result()[1] == -1 else 0
+        __results__.append(('decompress', '', infilename, result))
+    __unpacker__ = None
+    __unpacks__ = []
+
+
+def streamable(infilename):
+    filename = os.path.basename(infilename).lower()
+    return __decompress__ and __remove__ and __serve__ == '' and \
+        re.fullmatch(r"^.*\.(gz|bz|bz2|lzma|xz)$", filename) is not None \
+        and re.fullmatch(r"^.*\.tar\.(gz|bz|bz2|lzma|xz)$", filename) is None
+
+
+def stream_decompressor(infilename):
+    import zlib
+    import bz2
+    import lzma
+    filename = os.path.basename(infilename).lower()
+    if re.fullmatch(r"^.*\.(gz)$", filename):
+        new = lambda: zlib.decompressobj(zlib.MAX_WBITS | 16)
+    elif re.fullmatch(r"^.*\.(bz|bz2)$", filename):
+        new = bz2.BZ2Decompressor
+    elif re.fullmatch(r"^.*\.(lzma|xz)$", filename):
+        new = lzma.LZMADecompressor
+    else:
+        raise ValueError('unknown file type')
+    state = [new(), False]
+
+    def feed(data):
+        if data is None:
+            if state[1] and not state[0].eof:
+                raise IOError('truncated compressed stream')
+            return b''
+        out = []
+        while data:
+            out.append(state[0].decompress(data))
+            state[1] = True
+            if state[0].eof:
+                data = state[0].unused_data
+                state[:] = [new(), False]
+            else:
+                data = b''
+        return b''.join(out)
+    return feed
+
+
 def clean(filename):
     if __remove__ and not re.fullmatch(r"^.*\.(txt|lst|torrent)$", filename.lower()):
         remove(filename)
@@ -171,147 +427,1047 @@ def remove(filename):
         pass
 
 
-def resolve_mediafire(link):
-    resolved = ''
+def http_session():
+    global __http__
+    if __http__ is None:
+        import requests
+        from urllib3.util.retry import Retry
+        with __lock__:
+            if __http__ is None:
+                retry = Retry(total=__retries__, backoff_factor=__backoff__,
+                              status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['HEAD', 'GET'])
+                adapter = requests.adapters.HTTPAdapter(pool_connections=__max_trds__,
+                                                        pool_maxsize=__max_trds__ * __segments__,
+                                                        max_retries=retry)
+                session = requests.Session()
+                session.headers.update({'User-Agent': __useragent__})
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                __http__ = session
+    return __http__
+
+
+def load_timed(filename, ttl):
     try:
-        page = requests.get(link, headers={'User-Agent': __useragent__})
-        html = BeautifulSoup(page.text, 'html.parser')
-        for i in html.find_all('a'):
-            if str(i.text).startswith('Download ('):
-                resolved = i['href']
+        with open(filename, 'r') as fp:
+            return dict([i for i in json.load(fp).items() if time.time() - i[1][-1] < ttl])
     except:
-        pass
+        return {}
+
+
+def save_timed(filename, entries):
+    if entries is None or filename == '':
+        return
+    try:
+        with open("{0}.tmp".format(filename), 'w') as fp:
+            json.dump(entries, fp)
+        os.replace("{0}.tmp".format(filename), filename)
+    except Exception as ex:
+        err('unable to save {0}'.format(filename), str(ex))
+
+
+def load_resolved():
+    global __resolved__
+    if __resolved__ is None:
+        __resolved__ = load_timed(__resolve_file_name__, __resolve_ttl__)
+    return __resolved__
+
+
+def save_resolved():
+    save_timed(__resolve_file_name__, __resolved__)
+
+
+def resolve_mediafire(link):
+    import html
+    with __lock__:
+        cached = load_resolved().get(link)
+    if cached is not None and time.time() - cached[1] < __resolve_ttl__:
+        return cached[0]
+    regex = re.compile(rb"href=[\"'](https?://download[0-9]*\.mediafire\.com/[^\"']+)[\"']")
+    match = None
+    data = b''
+    page = http_session().get(link, stream=True, timeout=__timeout__)
+    try:
+        page.raise_for_status()
+        for block in page.iter_content(chunk_size=64 * 1024):
+            match = regex.search(data[-1024:] + block)
+            data = data[-1024:] + block
+            if match is not None:
+                break
     finally:
-        return resolved
+        page.close()
+    if match is None:
+        raise ValueError('unable to resolve mediafire link {0}'.format(link))
+    resolved = html.unescape(match.group(1).decode())
+    with __lock__:
+        __resolved__[link] = [resolved, time.time()]
+    return resolved
+
+
+def http_link(name):
+    config = __urls__[name]
+    if config.get('http', '') != '' and (__prefer_http__ or config.get('torrent', '') == ''):
+        return config['http']
+    return ''
+
+
+def resolve_links(names):
+    from concurrent.futures import ThreadPoolExecutor
+    cached = load_resolved()
+    links = set([http_link(i) for i in names if http_link(i).startswith('http://www.mediafire.com/file/')])
+    links = [i for i in links if i not in cached]
+    if links.__len__() <= 0:
+        return
+    info("resolving {0} mediafire links".format(links.__len__()))
+    with ThreadPoolExecutor(__max_trds__) as pool:
+        futures = [(i, pool.submit(resolve_mediafire, i)) for i in links]
+        for link, future in futures:
+            if future.exception() is not None:
+                warn("unable to resolve {0}: {1}".format(link, str(future.exception())))
+    save_resolved()
+
+
+def probe_size(url):
+    rq = http_session().head(source_url(url), allow_redirects=True, headers={'Accept-Encoding': 'identity'},
+                             timeout=__timeout__)
+    rq.raise_for_status()
+    if 'Content-Length' not in rq.headers:
+        return None, None
+    size = int(rq.headers['Content-Length'])
+    unpacked = None
+    if re.fullmatch(r"^.*\.gz$", url.lower()) and size >= 18 and rq.headers.get('Accept-Ranges') == 'bytes':
+        tail = http_session().get(rq.url, headers={'Accept-Encoding': 'identity',
+                                                   'Range': 'bytes={0}-{1}'.format(size - 4, size - 1)},
+                                  timeout=__timeout__)
+        if tail.status_code == 206 and tail.content.__len__() == 4:
+            unpacked = struct.unpack('<I', tail.content)[0]
+            while unpacked * 2 < size:
+                unpacked += 1 << 32
+    return size, unpacked
+
+
+def wordlist_sizes(names):
+    global __sizes__
+    from concurrent.futures import ThreadPoolExecutor
+    if __sizes__ is None:
+        __sizes__ = load_timed(__sizes_file_name__, __sizes_ttl__)
+    links = set([http_link(i) for i in names if __urls__[i].get('size') is None]) - set(__sizes__) - {''}
+    if links.__len__() > 0 and __mirror_url__ == '':
+        info("probing sizes of {0} wordlists".format(links.__len__()))
+        with ThreadPoolExecutor(__max_trds__) as pool:
+            futures = [(i, pool.submit(probe_size, i)) for i in links]
+            for link, future in futures:
+                if future.exception() is not None:
+                    warn("unable to probe {0}: {1}".format(link, str(future.exception())))
+                __sizes__[link] = [None, None, time.time()] if future.exception() is not None else \
+                    list(future.result()) + [time.time()]
+        save_timed(__sizes_file_name__, __sizes__)
+    sizes = {}
+    for name in names:
+        size, unpacked = __sizes__.get(http_link(name), [None, None, 0])[:2]
+        sizes[name] = (__urls__[name].get('size', size), __urls__[name].get('uncompressed', unpacked))
+    return sizes
+
+
+def preflight(sizes):
+    import shutil
+    needed = 0
+    estimated = 0
+    largest = 0
+    for name, (size, unpacked) in sizes.items():
+        if size is None:
+            continue
+        filename = (http_link(name) or __urls__[name].get('torrent', '')).split('/')[-1].lower()
+        if not __decompress__ or re.fullmatch(r"^.*\.(rar|zip|7z|tar|gz|bz|bz2|lzma|xz)$", filename) is None:
+            needed += size
+            continue
+        if __remove__:
+            largest = max(largest, size)
+        else:
+            needed += size
+        if unpacked is None:
+            estimated += size * __unpack_ratio__
+        else:
+            needed += unpacked
+    needed += largest
+    free = shutil.disk_usage(__wordlist_path__).free
+    if needed > free:
+        raise IOError('not enough disk space in {0}: {1} needed, {2} free'.format(
+            __wordlist_path__, human_size(needed), human_size(free)))
+    if needed + estimated > free:
+        warn("wordlists may not fit in {0}: about {1} needed, {2} free".format(
+            __wordlist_path__, human_size(needed + estimated), human_size(free)))
+
+
+def schedule(names, sizes):
+    known = sorted([i[0] for i in sizes.values() if i[0] is not None])
+    median = known[known.__len__() // 2] if known.__len__() > 0 else 0
+    return sorted(names, key=lambda i: -(sizes[i][0] if i in sizes and sizes[i][0] is not None else median))
+
+
+def torrent_settings():
+    import libtorrent
+    return {'alert_mask': libtorrent.alert_category.status | libtorrent.alert_category.error,
+            'active_downloads': __max_trds__,
+            'active_limit': __max_trds__ * 2,
+            'connections_limit': __torrent_connections__,
+            'download_rate_limit': __rate_limit__ * 1024,
+            'enable_dht': True}
+
+
+def torrent_session():
+    global __session__
+    global __torrent_cv__
+    global __torrent_thread__
+    import libtorrent
+    with __lock__:
+        if __session__ is None:
+            __session__ = libtorrent.session(dict(torrent_settings(), listen_interfaces='0.0.0.0:6881'))
+            __torrent_cv__ = threading.Condition(__lock__)
+            __torrent_thread__ = threading.Thread(target=torrent_alerts, args=(__session__,), daemon=True)
+            __torrent_thread__.start()
+    return __session__
+
+
+def add_torrent(url, path, name, params):
+    session = torrent_session()
+    handle = session.add_torrent(params)
+    with __lock__:
+        __torrents__[str(handle.info_hash())] = (url, path, name, handle, time.time())
+    return handle
+
+
+def finish_torrent(key, result):
+    with __lock__:
+        torrent = __torrents__.pop(key, None)
+        if torrent is None:
+            return None
+        __received__ = torrent[3].status().total_payload_download
+        __session__.remove_torrent(torrent[3])
+        __results__.append(('torrent', torrent[0], torrent[1], result))
+        __torrent_cv__.notify_all()
+    start_metric(torrent[1])
+    count_bytes(torrent[1], __received__)
+    record_metric('torrent', torrent[1], name=torrent[2], url=torrent[0], seconds=time.time() - torrent[4],
+                  result=result)
+    return torrent
+
+
+def complete_torrent(key):
+    with __lock__:
+        torrent = __torrents__.get(key)
+    if torrent is None:
+        return
+    url, path, name, handle, _ = torrent
+    __torrentname__ = handle.status().name
+    __outfilename__ = "{0}/{1}".format(os.path.dirname(path), __torrentname__)
+    try:
+        record_install(name, url, __outfilename__,
+                       hash_file(__outfilename__).hexdigest() if os.path.isfile(__outfilename__) else None)
+        success('downloading {0} completed'.format(__torrentname__))
+        queue_decompress(__outfilename__, name)
+        finish_torrent(key, 0)
+    except Exception as ex:
+        err("Error while downloading {0}".format(url), str(ex))
+        finish_torrent(key, -1)
+
+
+def torrent_alert(alert, key, torrent, completing):
+    import libtorrent
+    if isinstance(alert, libtorrent.metadata_received_alert):
+        success('downloaded metadata')
+        __torrentname__ = alert.handle.status().name
+        __outfilename__ = "{0}/{1}".format(os.path.dirname(torrent[1]), __torrentname__)
+        if installed(torrent[2], __outfilename__):
+            warn("{0} already exists -- skipping".format(__torrentname__))
+            finish_torrent(key, 0)
+        else:
+            info("downloading {0}".format(__torrentname__))
+    elif isinstance(alert, libtorrent.torrent_finished_alert) and key not in completing:
+        completing.add(key)
+        threading.Thread(target=complete_torrent, args=(key,), daemon=True).start()
+    elif isinstance(alert, (libtorrent.torrent_error_alert, libtorrent.metadata_failed_alert,
+                            libtorrent.file_error_alert)):
+        err("Error while downloading {0}".format(torrent[0]), alert.message())
+        finish_torrent(key, -1)
+
+
+def torrent_alerts(session):
+    completing = set()
+    while __session__ is session:
+        session.wait_for_alert(500)
+        for alert in session.pop_alerts():
+            if not hasattr(alert, 'handle'):
+                continue
+            key = str(alert.handle.info_hash())
+            with __lock__:
+                torrent = __torrents__.get(key)
+            if torrent is None:
+                completing.discard(key)
+                continue
+            try:
+                torrent_alert(alert, key, torrent, completing)
+            except Exception as ex:
+                err("Error while downloading {0}".format(torrent[0]), str(ex))
+                finish_torrent(key, -1)
+
+
+def join_torrents(cancel=False):
+    if __torrent_cv__ is None:
+        return
+    with __torrent_cv__:
+        if cancel:
+            for torrent in __torrents__.values():
+                __session__.remove_torrent(torrent[3])
+                __results__.append(('torrent', torrent[0], torrent[1], None))
+            __torrents__.clear()
+            __torrent_cv__.notify_all()
+        while __torrents__.__len__() > 0:
+            if __torrent_thread__ is None or not __torrent_thread__.is_alive():
+                for torrent in __torrents__.values():
+                    __session__.remove_torrent(torrent[3])
+                    __results__.append(('torrent', torrent[0], torrent[1], -1))
+                __torrents__.clear()
+                break
+            __torrent_cv__.wait(1)
+
+
+def close_torrents(force=False):
+    global __session__
+    global __torrent_thread__
+    if __torrent_thread__ is None or (__keep_torrents__ and not force):
+        return
+    __session__ = None
+    __torrent_thread__.join()
+    __torrent_thread__ = None
+
+
+def worker(jobs):
+    while True:
+        job = jobs.get()
+        try:
+            if job is None:
+                break
+            func, url, path, name = job
+            result = None
+            if not __cancel__.is_set():
+                result = -1
+                result = func(url, path, name)
+        except Exception as ex:
+            err("Error while running job", str(ex))
+        finally:
+            if job is not None:
+                with __lock__:
+                    __results__.append((func.__name__, url, path, result))
+            jobs.task_done()
+
+
+def start_workers():
+    global __jobs__
+    global __cancel__
+    if __jobs__ is not None:
+        return
+    __jobs__ = queue.Queue(maxsize=__max_trds__ * 2)
+    if __cancel__ is None:
+        __cancel__ = threading.Event()
+    for _ in range(__max_trds__):
+        t = threading.Thread(target=worker, args=(__jobs__,), daemon=True)
+        t.start()
+        __trds__.append(t)
+
+
+def submit_job(func, url, path, name=''):
+    start_workers()
+    __jobs__.put((func, url, path, name))
+
+
+def join_workers():
+    global __jobs__
+    global __trds__
+    if __jobs__ is None:
+        return
+    for _ in __trds__:
+        __jobs__.put(None)
+    for t in __trds__:
+        t.join()
+    __jobs__ = None
+    __trds__ = []
+
+
+def cancel_jobs():
+    if __jobs__ is not None:
+        __cancel__.set()
+        join_workers()
+    join_torrents(cancel=True)
+    close_torrents()
+    join_decompress(cancel=True)
+
+
+def report_jobs():
+    global __results__
+    failed = [i for i in __results__ if i[3] == -1]
+    cancelled = [i for i in __results__ if i[3] is None]
+    if __results__.__len__() > 1:
+        info("{0} jobs finished: {1} succeeded, {2} failed, {3} cancelled".format(
+            __results__.__len__(), __results__.__len__() - failed.__len__() - cancelled.__len__(),
+            failed.__len__(), cancelled.__len__()))
+        for i in failed:
+            err("{0} failed".format(os.path.basename(i[2])), i[1])
+    __results__ = []
+    return failed.__len__()
+
+
+def start_metric(path, total=None):
+    with __lock__:
+        entry = __metrics__.setdefault(path, {'bytes': 0, 'total': 0, 'retries': 0})
+        entry['active'] = True
+        if total is not None:
+            entry['total'] = entry['bytes'] + total
+
+
+def init_stage(write_limit, bucket):
+    global __write_limit__
+    __write_limit__ = write_limit
+    if bucket is not None:
+        __buckets__['disk'] = bucket
+
+
+def token_bucket(kind):
+    with __lock__:
+        if kind not in __buckets__:
+            import multiprocessing
+            __buckets__[kind] = multiprocessing.get_context('spawn').Array('d', [0.0, time.monotonic()])
+        return __buckets__[kind]
+
+
+def take_tokens(kind, size, limit):
+    if limit <= 0 or size <= 0:
+        return 0
+    rate = limit * 1024
+    bucket = token_bucket(kind)
+    with bucket.get_lock():
+        now = time.monotonic()
+        bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate) - size
+        bucket[1] = now
+        return max(0.0, -bucket[0] / rate)
+
+
+def throttle(received=0, written=0):
+    return max(take_tokens('net', received, __rate_limit__), take_tokens('disk', written, __write_limit__))
+
+
+def pause(seconds):
+    if seconds <= 0:
+        return
+    if __cancel__ is not None:
+        __cancel__.wait(seconds)
+    else:
+        time.sleep(seconds)
+
+
+def count_bytes(path, size):
+    with __lock__:
+        entry = __metrics__.get(path)
+        if entry is not None:
+            entry['bytes'] += size
+
+
+def record_metric(event, path, **fields):
+    with __lock__:
+        entry = __metrics__.setdefault(path, {'bytes': 0, 'total': 0, 'retries': 0})
+        entry[event] = entry.get(event, 0) + fields.get('seconds', 0)
+        entry['retries'] += fields.get('retries', 0)
+        metric = dict({'time': round(time.time(), 3), 'event': event, 'path': path}, **fields)
+        metric['seconds'] = round(fields.get('seconds', 0), 3)
+        if event in ['download', 'torrent']:
+            entry['active'] = False
+            metric['bytes'] = entry['bytes']
+            metric['rate'] = round(entry['bytes'] / max(fields.get('seconds', 0), 0.001))
+        if __metrics_file__ != '':
+            with open(__metrics_file__, 'a') as fp:
+                fp.write("{0}\n".format(json.dumps(metric)))
+
+
+def timed(func, *args):
+    __start__ = time.time()
+    result = func(*args)
+    return time.time() - __start__, result
+
+
+def human_size(size):
+    for unit in ['B', 'KiB', 'MiB', 'GiB', 'TiB']:
+        if size < 1024 or unit == 'TiB':
+            break
+        size /= 1024.0
+    return "{0:.1f} {1}".format(size, unit)
+
+
+def print_progress(rate):
+    with __lock__:
+        entries = list(__metrics__.values())
+        done = __results__.__len__()
+        torrents = [i[3] for i in __torrents__.values()]
+        unpacking = [i for i in __unpacks__ if not i[1].done()].__len__()
+    queued = [i for i in list(__jobs__.queue) if i is not None].__len__() if __jobs__ is not None else 0
+    received = sum([i['bytes'] for i in entries])
+    remaining = sum([max(0, i['total'] - i['bytes']) for i in entries if i.get('active')])
+    received += sum([i.status().total_payload_download for i in torrents])
+    eta = time.strftime('%H:%M:%S', time.gmtime(remaining / rate)) if rate > 0 and remaining > 0 else '--:--:--'
+    sys.stdout.write("\r\033[K" + colored("[*]", 'blue', attrs=['bold']) +
+                     " {0} done, {1} active, {2} queued, {3} torrents, {4} unpacking | {5} at {6}/s | ETA {7}".format(
+                         done, [i for i in entries if i.get('active')].__len__(),
+                         queued, torrents.__len__(), unpacking,
+                         human_size(received), human_size(rate), eta))
+    sys.stdout.flush()
+    return received
+
+
+def progress(done):
+    last, __start__ = 0, time.time()
+    rate = 0.0
+    while not done.wait(1):
+        now = time.time()
+        received = print_progress(rate)
+        rate = 0.7 * rate + 0.3 * (received - last) / max(now - __start__, 0.001)
+        last, __start__ = received, now
+
+
+def start_progress():
+    global __progress_done__
+    if not __progress__ or __progress_done__ is not None:
+        return
+    __progress_done__ = threading.Event()
+    threading.Thread(target=progress, args=(__progress_done__,), daemon=True).start()
+
+
+def stop_progress():
+    global __progress_done__
+    if __progress_done__ is None:
+        return
+    __progress_done__.set()
+    __progress_done__ = None
+    entries = list(__metrics__.values())
+    print("")
+    info("{0} in {1:.1f}s download, {2:.1f}s decompress, {3:.1f}s clean, {4} retries".format(
+        human_size(sum([i['bytes'] for i in entries])), sum([i.get('download', 0) + i.get('torrent', 0)
+                                                             for i in entries]),
+        sum([i.get('decompress', 0) for i in entries]), sum([i.get('clean', 0) for i in entries]),
+        sum([i['retries'] for i in entries])))
 
 
 def run_threaded(func):
-    def wrapper(url, path):
-        if func.__name__ == 'fetch_torrent':
-            global __session__
-            if __session__ is None:
-                __session__ = libtorrent.session({'listen_interfaces': '0.0.0.0:6881'})
-                __session__.start_dht()
-        elif str(path).endswith('.torrent'):
-            func(url, path)
-            return
+    def wrapper(url, path, name=''):
+        if func.__name__ != 'fetch_torrent' and str(path).endswith('.torrent'):
+            return func(url, path, name)
+        submit_job(func, url, path, name)
+    wrapper.__name__ = func.__name__
+    return wrapper
+
+
+def load_journal(path):
+    try:
+        with open("{0}.part.json".format(path), 'r') as fp:
+            return json.load(fp)
+    except:
+        return {}
+
+
+def save_journal(path, journal):
+    with open("{0}.part.json".format(path), 'w') as fp:
+        json.dump(journal, fp)
+
+
+def finish_part(path):
+    os.replace("{0}.part".format(path), path)
+    remove("{0}.part.json".format(path))
+
+
+def resume_headers(path, journal):
+    offset = 0
+    headers = {'Accept-Encoding': 'identity'}
+    if journal and os.path.isfile("{0}.part".format(path)):
+        offset = os.path.getsize("{0}.part".format(path))
+    if offset > 0:
+        headers['Range'] = 'bytes={0}-'.format(offset)
+        if journal.get('etag') or journal.get('last_modified'):
+            headers['If-Range'] = journal.get('etag') or journal.get('last_modified')
+    return offset, headers
+
+
+def start_part(url, path, journal, offset, status, headers):
+    filename = os.path.basename(path)
+    if status == 416:
+        if offset != journal.get('size'):
+            remove("{0}.part".format(path))
+            remove("{0}.part.json".format(path))
+            raise IOError('server refused to resume {0}'.format(filename))
+        return journal, offset, None
+    if status == 206:
+        info("resuming {0} at {1} bytes".format(filename, offset))
+        mode = 'ab'
+    else:
+        info("downloading {0}".format(filename))
+        offset = 0
+        mode = 'wb'
+    length = headers.get('Content-Length')
+    journal = {'url': url, 'etag': headers.get('ETag', ''),
+               'last_modified': headers.get('Last-Modified', ''),
+               'size': offset + int(length) if length else None}
+    save_journal(path, journal)
+    start_metric(path, int(length) if length else None)
+    return journal, offset, mode
+
+
+def fetch_stream(url, str_url, path, journal):
+    offset, headers = resume_headers(path, journal)
+    rq = http_session().get(str_url, stream=True, headers=headers, timeout=__timeout__)
+    if rq.status_code != 416:
+        rq.raise_for_status()
+    journal, offset, mode = start_part(url, path, journal, offset, rq.status_code, rq.headers)
+    if mode is None:
+        rq.close()
+        return None
+    hasher = hashlib.sha256() if mode == 'wb' else hash_file("{0}.part".format(path))
+    with open("{0}.part".format(path), mode) as fp:
+        for data in rq.iter_content(chunk_size=__chunk_size__):
+            if __cancel__ is not None and __cancel__.is_set():
+                raise InterruptedError('download cancelled')
+            fp.write(data)
+            hasher.update(data)
+            offset += data.__len__()
+            count_bytes(path, data.__len__())
+            pause(throttle(data.__len__(), data.__len__()))
+    if journal.get('size') is not None and offset != journal['size']:
+        raise IOError('incomplete download ({0} of {1} bytes)'.format(offset, journal['size']))
+    return hasher.hexdigest()
+
+
+def fetch_decompressed(str_url, path):
+    filename = os.path.basename(path)
+    outfile = os.path.splitext(path)[0]
+    feed = stream_decompressor(path)
+    rq = http_session().get(str_url, stream=True, headers={'Accept-Encoding': 'identity'}, timeout=__timeout__)
+    rq.raise_for_status()
+    start_metric(path, int(rq.headers['Content-Length']) if 'Content-Length' in rq.headers else None)
+    info("downloading and decompressing {0}".format(filename))
+    hasher = hashlib.sha256()
+    unpacked = hashlib.sha256()
+    with open("{0}.part".format(outfile), 'wb') as fp:
+        for data in rq.iter_content(chunk_size=__chunk_size__):
+            if __cancel__ is not None and __cancel__.is_set():
+                raise InterruptedError('download cancelled')
+            hasher.update(data)
+            block = feed(data)
+            fp.write(block)
+            unpacked.update(block)
+            count_bytes(path, data.__len__())
+            pause(throttle(data.__len__(), block.__len__()))
+        feed(None)
+    os.replace("{0}.part".format(outfile), outfile)
+    return hasher.hexdigest(), unpacked.hexdigest()
+
+
+def fetch_segment(str_url, headers, fd, segment, path, journal, lock, errors):
+    try:
+        headers = dict(headers, Range='bytes={0}-{1}'.format(segment[0] + segment[2], segment[1] - 1))
+        rq = http_session().get(str_url, stream=True, headers=headers, timeout=__timeout__)
+        rq.raise_for_status()
+        if rq.status_code != 206:
+            rq.close()
+            raise ValueError('server ignored range request')
+        for data in rq.iter_content(chunk_size=__chunk_size__):
+            if __cancel__ is not None and __cancel__.is_set():
+                raise InterruptedError('download cancelled')
+            data = data[:segment[1] - segment[0] - segment[2]]
+            os.pwrite(fd, data, segment[0] + segment[2])
+            with lock:
+                segment[2] += data.__len__()
+                save_journal(path, journal)
+            count_bytes(path, data.__len__())
+            pause(throttle(data.__len__(), data.__len__()))
+    except Exception as ex:
+        errors.append(ex)
+
+
+def fetch_segments(url, str_url, path, journal):
+    filename = os.path.basename(path)
+    part = "{0}.part".format(path)
+    headers = {'Accept-Encoding': 'identity'}
+    if journal.get('segments') and os.path.isfile(part):
+        info("resuming {0} in {1} segments".format(filename, journal['segments'].__len__()))
+    else:
+        rq = http_session().head(str_url, headers=headers, allow_redirects=True, timeout=__timeout__)
+        rq.raise_for_status()
+        size = int(rq.headers.get('Content-Length', 0))
+        count = min(__segments__, size // __segment_size__)
+        if rq.headers.get('Accept-Ranges', '') != 'bytes' or count < 2:
+            return False
+        step = size // count
+        journal = {'url': url, 'etag': rq.headers.get('ETag', ''),
+                   'last_modified': rq.headers.get('Last-Modified', ''), 'size': size,
+                   'segments': [[i * step, size if i == count - 1 else (i + 1) * step, 0] for i in range(count)]}
+        fd = os.open(part, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
         try:
-            while True:
-                if __trds__.__len__() >= __max_trds__:
-                    for i in __trds__:
-                        if not i.isAlive():
-                            __trds__.remove(i)
-                    time.sleep(0.01)
-                else:
-                    break
-            t = threading.Thread(target=func, args=(url, path))
+            if hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(fd, 0, size)
+            else:
+                os.ftruncate(fd, size)
+        finally:
+            os.close(fd)
+        save_journal(path, journal)
+        info("downloading {0} in {1} segments".format(filename, count))
+    if journal.get('etag') or journal.get('last_modified'):
+        headers['If-Range'] = journal.get('etag') or journal.get('last_modified')
+    start_metric(path, sum([i[1] - i[0] - i[2] for i in journal['segments']]))
+    lock = threading.Lock()
+    errors = []
+    fd = os.open(part, os.O_RDWR)
+    try:
+        trds = [threading.Thread(target=fetch_segment, args=(str_url, headers, fd, i, path, journal, lock, errors))
+                for i in journal['segments'] if i[0] + i[2] < i[1]]
+        for t in trds:
             t.start()
-            __trds__.append(t)
-        except KeyboardInterrupt:
-            exit(0)
-        except:
-            pass
-    return wrapper
+        for t in trds:
+            t.join()
+    finally:
+        os.close(fd)
+    if [i for i in errors if isinstance(i, ValueError)]:
+        remove(part)
+        remove("{0}.part.json".format(path))
+    if errors.__len__() > 0:
+        raise errors[0]
+    if os.path.getsize(part) != journal['size'] or [i for i in journal['segments'] if i[0] + i[2] != i[1]]:
+        raise IOError('incomplete download of {0}'.format(filename))
+    return True
+
+
+def source_url(url):
+    if str(url).startswith('http://www.mediafire.com/file/'):
+        return resolve_mediafire(url)
+    return url
+
+
+def mirror_sources(url, name):
+    import urllib.parse
+    if __mirror_url__ == '' or name == '' or str(url).startswith(__mirror_url__):
+        return [url]
+    return ["{0}/{1}".format(__mirror_url__.rstrip('/'), urllib.parse.quote(name)), url]
+
+
+def mirror_file(name):
+    import requests
+    try:
+        rq = http_session().head(mirror_sources('', name)[0], allow_redirects=True, timeout=__timeout__)
+        rq.raise_for_status()
+        return rq.url
+    except requests.exceptions.RequestException:
+        return None
+
+
+def verify_download(name, path, digest):
+    expected = __urls__.get(name, {})
+    part = "{0}.part".format(path)
+    mismatch = expected.get('size') is not None and os.path.isfile(part) and \
+        os.path.getsize(part) != int(expected['size'])
+    if not mismatch and expected.get('sha256'):
+        if digest is None:
+            digest = hash_file(part).hexdigest()
+        mismatch = digest != expected['sha256'].lower()
+    if mismatch:
+        remove(part)
+        remove("{0}.part.json".format(path))
+        if streamable(path):
+            remove(os.path.splitext(path)[0])
+        raise IOError('checksum mismatch for {0}'.format(os.path.basename(path)))
+    return digest
+
+
+def retryable(ex):
+    import requests
+    import urllib3
+    if isinstance(ex, requests.exceptions.ConnectionError) and ex.args and \
+            isinstance(ex.args[0], urllib3.exceptions.MaxRetryError):
+        return False
+    if isinstance(ex, (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError,
+                       requests.exceptions.Timeout)):
+        return True
+    if isinstance(ex, requests.exceptions.HTTPError) and ex.response is not None:
+        return ex.response.status_code >= 500 or ex.response.status_code == 429
+    return isinstance(ex, IOError) and not isinstance(ex, (requests.exceptions.RequestException, InterruptedError))
 
 
 @run_threaded
-def fetch_file(url, path):
+def fetch_file(url, path, name=''):
     filename = os.path.basename(path)
     str_url = url
+    __start__ = time.time()
+    attempt = 0
     try:
-        if check_file(path):
+        if installed(name, path):
             warn("{0} already exists -- skipping".format(filename))
         else:
-            info("downloading {0}".format(filename))
-            if str(url).startswith('http://www.mediafire.com/file/'):
-                str_url = resolve_mediafire(url)
-            chunk_size = 1024
-            rq = requests.get(str_url, stream=True, headers={'User-Agent': __useragent__})
-            fp = open(path, 'wb')
-            for data in rq.iter_content(chunk_size=chunk_size):
-                fp.write(data)
-            fp.close()
+            start_metric(path)
+            sources = mirror_sources(url, name)
+            str_url = source_url(sources.pop(0))
+            while True:
+                journal = load_journal(path)
+                if journal.get('url') != url or not os.path.isfile("{0}.part".format(path)):
+                    journal = {}
+                try:
+                    digest = None
+                    unpacked = None
+                    if streamable(path):
+                        digest, unpacked = fetch_decompressed(str_url, path)
+                    elif not ((journal.get('segments') or (__segments__ > 1 and not journal))
+                              and fetch_segments(url, str_url, path, journal)):
+                        digest = fetch_stream(url, str_url, path, journal)
+                    digest = verify_download(name, path, digest)
+                    break
+                except Exception as ex:
+                    if sources.__len__() > 0 and not isinstance(ex, InterruptedError):
+                        warn("mirror failed for {0}, falling back to upstream: {1}".format(filename, str(ex)))
+                        str_url = source_url(sources.pop(0))
+                        continue
+                    if attempt >= __retries__ or not retryable(ex):
+                        raise
+                    attempt += 1
+                    warn("retrying {0} ({1}/{2}): {3}".format(filename, attempt, __retries__, str(ex)))
+                    if __cancel__.wait(__backoff__ * 2 ** attempt):
+                        raise InterruptedError('download cancelled')
+            record_metric('download', path, name=name, url=url, seconds=time.time() - __start__,
+                          retries=attempt, result=0)
+            if streamable(path):
+                record_install(name, url, path, digest, {os.path.splitext(path)[0]: unpacked})
+                success("downloading and decompressing {0} completed".format(filename))
+                queue_decompress(os.path.splitext(path)[0], name)
+                return 0
+            finish_part(path)
+            record_install(name, url, path, digest or hash_file(path).hexdigest())
             success("downloading {0} completed".format(filename))
-        if decompress(path) != -1:
-            clean(path)
+        queue_decompress(path, name)
+        return 0
     except KeyboardInterrupt:
-        return
+        return -1
     except Exception as ex:
         err("Error while downloading {0}".format(url), str(ex))
-        remove(path)
+        record_metric('download', path, name=name, url=url, seconds=time.time() - __start__,
+                      retries=attempt, result=-1)
+        return -1
 
 
 @run_threaded
-def fetch_torrent(url, path):
-    global __session__
-    magnet = False
-    if str(url).startswith('magnet:?'):
-        magnet = True
-    handle = None
-    try:
-        if magnet:
-            handle = libtorrent.add_magnet_uri(__session__, url,
-                                               {'save_path': os.path.dirname(path), 'storage_mode': libtorrent.storage_mode_t(2),
-                                                'paused': False, 'auto_managed': True, 'duplicate_is_error': True}
-                                               )
+def fetch_torrent(url, path, name=''):
+    try:
+        if installed(name, ''):
+            warn("{0} already exists -- skipping".format(name))
+            return 0
+        import libtorrent
+        if str(url).startswith('magnet:?'):
+            params = libtorrent.parse_magnet_uri(url)
             info('downloading metadata\n')
-            while not handle.has_metadata():
-                time.sleep(0.1)
-            success('downloaded metadata')
         else:
-            fetch_file(url, path)
-
-            if os.path.isfile(path):
-                handle = __session__.add_torrent({'ti': libtorrent.torrent_info(path), 'save_path': os.path.dirname(path)})
-                remove(path)
-            else:
-                err("{0} not found".format(path))
-                exit(-1)
-        __outfilename__ = "{0}/{1}".format(os.path.dirname(path), handle.name())
-        if check_file(__outfilename__):
-            warn("{0} already exists -- skipping".format(handle.name()))
-            __session__.remove_torrent(handle)
-        else:
-            info("downloading {0}".format(handle.name()))
-            while not handle.is_seed():
-                time.sleep(0.1)
-            __session__.remove_torrent(handle)
-            success('downloading {0} completed'.format(handle.name()))
-        if decompress(__outfilename__) != -1:
-            clean(__outfilename__)
+            if fetch_file(url, path) != 0 or not os.path.isfile(path):
+                raise FileNotFoundError("{0} not found".format(path))
+            params = libtorrent.add_torrent_params()
+            params.ti = libtorrent.torrent_info(path)
+            remove(path)
+            __outfilename__ = "{0}/{1}".format(os.path.dirname(path), params.ti.name())
+            if installed(name, __outfilename__):
+                warn("{0} already exists -- skipping".format(params.ti.name()))
+                return 0
+            info("downloading {0}".format(params.ti.name()))
+        params.save_path = os.path.dirname(path)
+        params.storage_mode = libtorrent.storage_mode_t(2)
+        params.flags |= libtorrent.torrent_flags.auto_managed
+        params.flags &= ~libtorrent.torrent_flags.paused
+        add_torrent(url, path, name, params)
+        return 0
     except KeyboardInterrupt:
-        return
+        return -1
     except Exception as ex:
         err("Error while downloading {0}".format(url), str(ex))
         remove(path)
+        return -1
+
+
+async def fetch_decompressed_async(client, str_url, path):
+    import asyncio
+    filename = os.path.basename(path)
+    outfile = os.path.splitext(path)[0]
+    feed = stream_decompressor(path)
+    async with client.get(str_url, headers={'Accept-Encoding': 'identity'}) as rq:
+        rq.raise_for_status()
+        info("downloading and decompressing {0}".format(filename))
+        hasher = hashlib.sha256()
+        unpacked = hashlib.sha256()
+        with open("{0}.part".format(outfile), 'wb') as fp:
+            async for data in rq.content.iter_chunked(__chunk_size__):
+                if __cancel__ is not None and __cancel__.is_set():
+                    raise InterruptedError('download cancelled')
+                hasher.update(data)
+                block = feed(data)
+                fp.write(block)
+                unpacked.update(block)
+                count_bytes(path, data.__len__())
+                await asyncio.sleep(throttle(data.__len__(), block.__len__()))
+            feed(None)
+    os.replace("{0}.part".format(outfile), outfile)
+    return hasher.hexdigest(), unpacked.hexdigest()
+
+
+async def fetch_file_async(client, url, path, name=''):
+    import asyncio
+    import aiohttp
+    filename = os.path.basename(path)
+    part = "{0}.part".format(path)
+    loop = asyncio.get_running_loop()
+    str_url = url
+    __start__ = time.time()
+    attempt = 0
+    try:
+        if installed(name, path):
+            warn("{0} already exists -- skipping".format(filename))
+        else:
+            start_metric(path)
+            sources = mirror_sources(url, name)
+            str_url = await loop.run_in_executor(None, source_url, sources.pop(0))
+            while True:
+                journal = load_journal(path)
+                if journal.get('url') != url or journal.get('segments') or not os.path.isfile(part):
+                    journal = {}
+                offset, headers = resume_headers(path, journal)
+                try:
+                    digest = None
+                    unpacked = None
+                    if streamable(path):
+                        digest, unpacked = await fetch_decompressed_async(client, str_url, path)
+                        digest = verify_download(name, path, digest)
+                        break
+                    async with client.get(str_url, headers=headers) as rq:
+                        if rq.status != 416:
+                            rq.raise_for_status()
+                        journal, offset, mode = start_part(url, path, journal, offset, rq.status, rq.headers)
+                        if mode is not None:
+                            hasher = hashlib.sha256() if mode == 'wb' else \
+                                await loop.run_in_executor(None, hash_file, part)
+                            with open(part, mode) as fp:
+                                async for data in rq.content.iter_chunked(__chunk_size__):
+                                    if __cancel__ is not None and __cancel__.is_set():
+                                        raise InterruptedError('download cancelled')
+                                    fp.write(data)
+                                    hasher.update(data)
+                                    offset += data.__len__()
+                                    count_bytes(path, data.__len__())
+                                    await asyncio.sleep(throttle(data.__len__(), data.__len__()))
+                            digest = hasher.hexdigest()
+                    if journal.get('size') is not None and offset != journal['size']:
+                        raise IOError('incomplete download ({0} of {1} bytes)'.format(offset, journal['size']))
+                    digest = verify_download(name, path, digest)
+                    break
+                except (aiohttp.ClientError, asyncio.TimeoutError, IOError) as ex:
+                    if isinstance(ex, InterruptedError):
+                        raise
+                    if sources.__len__() > 0:
+                        warn("mirror failed for {0}, falling back to upstream: {1}".format(filename, str(ex)))
+                        str_url = await loop.run_in_executor(None, source_url, sources.pop(0))
+                        continue
+                    if attempt >= __retries__ or (isinstance(ex, aiohttp.ClientResponseError)
+                                                  and ex.status < 500 and ex.status != 429):
+                        raise
+                    attempt += 1
+                    warn("retrying {0} ({1}/{2}): {3}".format(filename, attempt, __retries__, str(ex)))
+                    if __cancel__ is None:
+                        await asyncio.sleep(__backoff__ * 2 ** attempt)
+                    elif await loop.run_in_executor(None, __cancel__.wait, __backoff__ * 2 ** attempt):
+                        raise InterruptedError('download cancelled')
+            record_metric('download', path, name=name, url=url, seconds=time.time() - __start__,
+                          retries=attempt, result=0)
+            if streamable(path):
+                record_install(name, url, path, digest, {os.path.splitext(path)[0]: unpacked})
+                success("downloading and decompressing {0} completed".format(filename))
+                queue_decompress(os.path.splitext(path)[0], name)
+                return 0
+            finish_part(path)
+            record_install(name, url, path, digest or (await loop.run_in_executor(None, hash_file, path)).hexdigest())
+            success("downloading {0} completed".format(filename))
+        queue_decompress(path, name)
+        return 0
+    except Exception as ex:
+        err("Error while downloading {0}".format(url), str(ex))
+        record_metric('download', path, name=name, url=url, seconds=time.time() - __start__,
+                      retries=attempt, result=-1)
+        return -1
+
+
+def fetch_files_async(jobs):
+    import asyncio
+    import aiohttp
+
+    async def run():
+        connector = aiohttp.TCPConnector(limit=__max_trds__, limit_per_host=__async__)
+        timeout = aiohttp.ClientTimeout(sock_connect=__timeout__, sock_read=__timeout__)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, auto_decompress=False,
+                                         headers={'User-Agent': __useragent__}) as client:
+            return await asyncio.gather(*[fetch_file_async(client, url, path, name) for url, path, name in jobs])
+
+    for (url, path, name), result in zip(jobs, asyncio.run(run())):
+        __results__.append(('fetch_file', url, path, result))
+
+
+def wordlist_dir(name):
+    if __category__ != '':
+        return "{0}/{1}".format(__wordlist_path__, __category__)
+    elif name in __index__['category']:
+        return "{0}/{1}".format(__wordlist_path__, __index__['category'][name])
+    return __wordlist_path__
+
+
+def wordlist_target(name):
+    __filename__ = (http_link(name) or __urls__[name].get('torrent', '')).split('/')[-1]
+    if __filename__ == '' or __filename__.startswith('magnet:'):
+        return ''
+    return "{0}/{1}".format(wordlist_dir(name), re.sub(r"\.torrent$", '', __filename__, flags=re.I))
+
+
+def missing_names(names):
+    missing = []
+    for name in names:
+        path = wordlist_target(name)
+        if installed(name, path):
+            warn("{0} already exists -- skipping".format(os.path.basename(path) or name))
+            queue_decompress(path, name)
+        else:
+            missing.append(name)
+    return missing
 
 
 def download_wordlist(config, wordlistname):
 
     __filename__ = ''
-    __file_directory__ = ''
+    __file_directory__ = wordlist_dir(wordlistname)
     __file_path__ = ''
 
-    if __category__ != '':
-        check_dir("{0}/{1}".format(__wordlist_path__, __category__))
-        __file_directory__ = "{0}/{1}".format(__wordlist_path__, __category__)
-    else:
-        for i in __categories__:
-            if wordlistname in __categories__[i]:
-                check_dir("{0}/{1}".format(__wordlist_path__, i))
-                __file_directory__ = "{0}/{1}".format(__wordlist_path__, i)
-                break
+    check_dir(__file_directory__)
 
     try:
         if (__prefer_http__ and config['http'] != "") or (config['torrent'] == "" and config['http'] != ""):
             __filename__ = config['http'].split('/')[-1]
             __file_path__ = "{0}/{1}".format(__file_directory__, __filename__)
-            fetch_file(config['http'], __file_path__)
+            if __async__ > 0:
+                __async_jobs__.append((config['http'], __file_path__, wordlistname))
+            else:
+                fetch_file(config['http'], __file_path__, wordlistname)
 
         elif config['torrent'] != "":
-            __filename__ = config['torrent'].split('/')[-1]
-            __file_path__ = "{0}/{1}".format(__file_directory__, __filename__)
-            fetch_torrent(config['torrent'], __file_path__)
+            __mirrored__ = mirror_file(wordlistname) if __mirror_url__ != '' else None
+            if __mirrored__ is not None:
+                __filename__ = os.path.basename(__mirrored__)
+                __file_path__ = "{0}/{1}".format(__file_directory__, __filename__)
+                fetch_file(__mirrored__, __file_path__, wordlistname)
+            else:
+                __filename__ = config['torrent'].split('/')[-1]
+                __file_path__ = "{0}/{1}".format(__file_directory__, __filename__)
+                fetch_torrent(config['torrent'], __file_path__, wordlistname)
 
         else:
             raise ValueError("unable to find wordlist's url")
@@ -327,41 +1483,62 @@ def download_wordlists(code):
     check_dir(__wordlist_path__)
 
     __wordlist_id__ = to_int(code)
+    ids = scope_ids()
+    if (__wordlist_id__ >= ids.__len__() + 1) or __wordlist_id__ < 0:
+        err("Error unable to download wordlist", '{0} is not a valid wordlist id'.format(code))
+        return -1
+    elif __wordlist_id__ == 0:
+        return download_names([__index__['names'][i - 1] for i in ids])
+    return download_names([__index__['names'][ids[__wordlist_id__ - 1] - 1]])
+
+
+def download_names(names):
+    start_progress()
     try:
-        if (__wordlist_id__ >= __urls__.__len__() + 1) or __wordlist_id__ < 0:
-            raise IndexError('{0} is not a valid wordlist id'.format(code))
-        elif __wordlist_id__ == 0:
-            if __category__ == '':
-                for i in __urls__:
-                    download_wordlist(__urls__[i], i)
-            else:
-                for i in __categories__[__category__]:
-                    download_wordlist(__urls__[i], i)
-        elif __category__ != '':
-            i = __urls__[__categories__[__category__][__wordlist_id__ - 1]]
-            download_wordlist(i, __categories__[__category__][__wordlist_id__ - 1])
-        else:
-            i = list(__urls__.keys())[__wordlist_id__ - 1]
-            download_wordlist(__urls__[i], list(__urls__.keys())[__wordlist_id__ - 1])
+        names = missing_names(names)
+        if __mirror_url__ == '':
+            resolve_links(names)
+        sizes = wordlist_sizes(names)
+        preflight(sizes)
+        for name in schedule(names, sizes):
+            download_wordlist(__urls__[name], name)
+        if __async_jobs__.__len__() > 0:
+            fetch_files_async(__async_jobs__)
+            del __async_jobs__[:]
+        join_workers()
+        join_torrents()
+        close_torrents()
+        join_decompress(cancel=__cancel__ is not None and __cancel__.is_set())
+    except KeyboardInterrupt:
+        warn("cancelling downloads")
+        cancel_jobs()
+        stop_progress()
+        save_manifest()
+        save_resolved()
+        report_jobs()
+        return -1
     except Exception as ex:
         err("Error unable to download wordlist", str(ex))
+        cancel_jobs()
+        stop_progress()
+        save_manifest()
+        save_resolved()
+        report_jobs()
+        return -1
+    stop_progress()
+    save_manifest()
+    save_resolved()
+    if report_jobs() > 0:
         return -1
     return 0
 
 
 def print_wordlists(categories=''):
     if categories == '':
-        index = 1
         success("available wordlists:")
         print("    > 0  - all wordlists")
-        urls = {}
-        if __category__ != '':
-            urls = __categories__[__category__]
-        else:
-            urls = __urls__.keys()
-        for i in urls:
-            print("    > {0}  - {1}".format(index, i))
-            index += 1
+        for index, i in enumerate(scope_ids(), 1):
+            print("    > {0}  - {1}".format(index, __index__['names'][i - 1]))
         print("")
     else:
         categories_list = set([i.strip() for i in categories.split(',')])
@@ -375,33 +1552,288 @@ def print_wordlists(categories=''):
                 print("    > {0}".format(j))
             print("")
 
+def trigrams(text):
+    text = '  {0} '.format(text.lower())
+    return set([text[i:i + 3] for i in range(text.__len__() - 2)])
+
+
+def dice(query, grams, count):
+    return 2.0 * count / (query.__len__() + grams)
+
+
+def compile_query(query):
+    try:
+        return re.compile(query, re.IGNORECASE)
+    except re.error:
+        return None
+
+
+def match_score(query, regex, text):
+    text = text.lower()
+    if text == query:
+        return 1000
+    if text.startswith(query):
+        return 900 - min(99, text.__len__() - query.__len__())
+    pos = text.find(query)
+    if pos != -1:
+        return 800 - min(99, pos)
+    if regex is not None and regex.search(text):
+        return 700
+    return 0
+
+
+def build_search():
+    index = {}
+    grams = []
+    for i, name in enumerate(__index__['names'], 1):
+        name = trigrams(name)
+        grams.append(name.__len__())
+        for j in name:
+            index.setdefault(j, []).append(i)
+    __index__['trigrams'] = index
+    __index__['grams'] = grams
+    __index__['text'] = '\n'.join(__index__['names']).lower()
+
+
+def search_index():
+    if 'trigrams' not in __index__ and not load_search():
+        build_search()
+    if 'starts' not in __index__:
+        __index__['starts'] = [0]
+        for i in __index__['names'][:-1]:
+            __index__['starts'].append(__index__['starts'][-1] + i.__len__() + 1)
+    return __index__['trigrams'], __index__['grams'], __index__['text'], __index__['starts']
+
+
+def rank_names(query, ids):
+    import bisect
+    import collections
+    import itertools
+    names = __index__['names']
+    regex = compile_query(query)
+    query = query.lower()
+    scope = set(ids)
+    scores = {}
+    index, grams, text, starts = search_index()
+    query_grams = trigrams(query)
+    shared = collections.Counter(itertools.chain.from_iterable([index.get(i, ()) for i in query_grams]))
+    least = __fuzzy__ * query_grams.__len__() / 2
+    for i, count in shared.items():
+        if count >= least and dice(query_grams, grams[i - 1], count) >= __fuzzy__:
+            scores[i] = int(600 * dice(query_grams, grams[i - 1], count))
+    for i in __categories__:
+        name = i.lower()
+        category_grams = trigrams(name)
+        if name.startswith(query) or dice(query_grams, category_grams.__len__(),
+                                          (category_grams & query_grams).__len__()) >= __fuzzy__:
+            for j in __index__['categories'].get(i, []):
+                scores[j] = max(scores.get(j, 0), 300)
+    if regex is not None:
+        for i in scope:
+            if scores.get(i, 0) < 700 and regex.search(names[i - 1]):
+                scores[i] = 700
+    if query != '':
+        for match in re.finditer(re.escape(query), text):
+            i = bisect.bisect_right(starts, match.start())
+            pos = match.start() - starts[i - 1]
+            score = 800 - min(99, pos)
+            if pos == 0:
+                score = 1000 if names[i - 1].__len__() == query.__len__() else \
+                    900 - min(99, names[i - 1].__len__() - query.__len__())
+            scores[i] = max(scores.get(i, 0), score)
+    return sorted([(j, i) for i, j in scores.items() if i in scope], key=lambda i: (-i[0], i[1]))
+
+
 def search_dir(regex):
-    info('searching for {0} in {1}\n'.format(regex, __wordlist_path__))
-    os.chdir(__wordlist_path__)
-    files = glob.glob("{0}".format(str(regex)))
-    if files.__len__() <= 0:
-        err("wordlist not found")
-        return
-    for file in files:
-        success("wordlist found: {0}".format(os.path.join(__wordlist_path__, file)))
+    import fnmatch
+    try:
+        info('searching for {0} in {1}\n'.format(regex, __wordlist_path__))
+        compiled = compile_query(regex)
+        query = regex.lower()
+        query_grams = trigrams(query)
+        results = []
+        for root, dirs, files in os.walk(__wordlist_path__):
+            dirs[:] = [i for i in dirs if not i.startswith('.')]
+            for file in [i for i in files if not i.startswith('.')]:
+                path = os.path.relpath(os.path.join(root, file), __wordlist_path__)
+                score = match_score(query, None, file)
+                if fnmatch.fnmatch(path, regex) or fnmatch.fnmatch(file, regex):
+                    score = 1000
+                elif score <= 0 and compiled is not None and compiled.fullmatch(file):
+                    score = 700
+                elif score <= 0:
+                    grams = trigrams(file)
+                    similarity = dice(query_grams, grams.__len__(), (grams & query_grams).__len__())
+                    score = int(600 * similarity) if similarity >= __fuzzy__ else 0
+                if score > 0:
+                    results.append((-score, path))
+        if results.__len__() <= 0:
+            err("wordlist not found")
+            return
+        for _, path in sorted(results):
+            success("wordlist found: {0}".format(os.path.join(__wordlist_path__, path)))
+    except KeyboardInterrupt:
+        pass
+    except Exception as ex:
+        err('Error while searching', str(ex))
+        return -1
 
 
 def search_sites(regex):
-    urls = []
-    if __category__ != '':
-        urls = list(__categories__[__category__])
-    else:
-        urls = list(__urls__.keys())
     try:
         info('searching for {0} in urls.json\n'.format(regex))
+        ids = list(scope_ids())
+        positions = dict([(i, index) for index, i in enumerate(ids, 1)])
+        if __install_filter__ != '':
+            manifest = load_manifest()
+            ids = [i for i in ids if (__index__['names'][i - 1] in manifest['wordlists'])
+                   == (__install_filter__ == 'installed')]
+        results = rank_names(regex, ids)
+        for _, i in results:
+            success('wordlist {0} found: id={1}'.format(__index__['names'][i - 1], positions[i]))
+
+        if results.__len__() == 0:
+            err('no wordlist found')
+    except KeyboardInterrupt:
+        pass
+    except Exception as ex:
+        err('Error while searching', str(ex))
+        return -1
+
+
+def indexable(path):
+    return re.fullmatch(r"^.*\.(rar|zip|7z|tar|gz|bz|bz2|lzma|xz|torrent|part|json)$", path.lower()) is None
+
+
+def index_path():
+    return "{0}/.wordlistctl-index".format(__wordlist_path__)
+
+
+def bloom_positions(item, k, m):
+    digest = int.from_bytes(hashlib.blake2b(item, digest_size=16).digest(), 'little')
+    h1 = digest & 0xffffffffffffffff
+    h2 = (digest >> 64) | 1
+    return [(h1 + i * h2) % m for i in range(k)]
+
+
+def bloom_file(path, index_dir):
+    return "{0}/{1}.bloom".format(index_dir, hashlib.sha1(os.path.abspath(path).encode()).hexdigest())
+
+
+def bloom_open(path, index_dir):
+    try:
+        st = os.stat(path)
+        with open(bloom_file(path, index_dir), 'rb') as fp:
+            magic, k, m, size, mtime = struct.unpack('<4sIQQq', fp.read(32))
+            if magic != b'WLB2' or size != st.st_size or mtime != st.st_mtime_ns:
+                return None
+            return k, m, fp.read()
+    except:
+        return None
+
+
+def bloom_contains(bloom, item):
+    k, m, bits = bloom
+    return all(bits[i >> 3] & (1 << (i & 7)) for i in bloom_positions(item, k, m))
+
+
+def index_file(path, index_dir):
+    if bloom_open(path, index_dir) is not None:
+        return 0
+    try:
+        st = os.stat(path)
+        with open(path, 'rb') as fp:
+            lines = sum(block.count(b'\n') for block in iter(lambda: fp.read(__chunk_size__), b'')) + 1
+        k = __bloom_hashes__
+        m = max(8192, (lines * 3 + min(lines, 1 << 20)) * __bloom_bits__ // 8 * 8)
+        bits = bytearray(m // 8)
+        with open(path, 'rb') as fp:
+            rest = b''
+            for block in iter(lambda: fp.read(16 * 1024 * 1024), b''):
+                words = (rest + block).split(b'\n')
+                rest = words.pop()
+                prefixes = set()
+                for word in set(words):
+                    word = word.rstrip(b'\r')
+                    for i in bloom_positions(word, k, m):
+                        bits[i >> 3] |= 1 << (i & 7)
+                    prefixes.update([word[:i] for i in __bloom_prefixes__ if i <= word.__len__()])
+                for prefix in prefixes:
+                    for i in bloom_positions(b'\0' + prefix, k, m):
+                        bits[i >> 3] |= 1 << (i & 7)
+            rest = rest.rstrip(b'\r')
+            if rest != b'':
+                for i in bloom_positions(rest, k, m):
+                    bits[i >> 3] |= 1 << (i & 7)
+                for prefix in [rest[:i] for i in __bloom_prefixes__ if i <= rest.__len__()]:
+                    for i in bloom_positions(b'\0' + prefix, k, m):
+                        bits[i >> 3] |= 1 << (i & 7)
+        os.makedirs(index_dir, exist_ok=True)
+        with open("{0}.tmp".format(bloom_file(path, index_dir)), 'wb') as fp:
+            fp.write(struct.pack('<4sIQQq', b'WLB2', k, m, st.st_size, st.st_mtime_ns))
+            fp.write(bits)
+        os.replace("{0}.tmp".format(bloom_file(path, index_dir)), bloom_file(path, index_dir))
+        return 0
+    except Exception as ex:
+        err('Error while indexing {0}'.format(os.path.basename(path)), str(ex))
+        return -1
+
+
+def contains_line(path, word, prefix):
+    import mmap
+    if os.path.getsize(path) <= 0:
+        return False
+    with open(path, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos = 0 if mm[:word.__len__()] == word else mm.find(b'\n' + word)
+        while pos != -1:
+            if mm[pos:pos + 1] == b'\n':
+                pos += 1
+            end = pos + word.__len__()
+            if prefix or mm[end:end + 1] in [b'\n', b'\r', b'']:
+                return True
+            pos = mm.find(b'\n' + word, pos)
+    return False
+
+
+def installed_files():
+    manifest = load_manifest()
+    files = []
+    for name, entry in manifest['wordlists'].items():
+        if __category__ != '' and __index__['category'].get(name) != __category__:
+            continue
+        for i in entry['outputs']:
+            path = os.path.join(__wordlist_path__, i)
+            if indexable(path) and os.path.isfile(path):
+                files.append(path)
+    return files
+
+
+def search_words(word):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    prefix = word.endswith('*')
+    word = word.rstrip('*').encode()
+    index_dir = index_path()
+    if word == b'' or b'\n' in word:
+        err('Error while searching', 'invalid word')
+        return -1
+    try:
+        info('searching for {0} in installed wordlists\n'.format(word.decode()))
+        files = installed_files()
+        missing = [i for i in files if bloom_open(i, index_dir) is None]
+        if missing.__len__() > 0:
+            info('indexing {0} wordlists'.format(missing.__len__()))
+            with ProcessPoolExecutor(min(__max_procs__, missing.__len__()), multiprocessing.get_context('spawn')) as pool:
+                list(pool.map(index_file, missing, [index_dir] * missing.__len__()))
+        item = b'\0' + word[:max(i for i in __bloom_prefixes__ if i <= word.__len__())] if prefix else word
         count = 0
-        for i in urls:
-            if re.match(regex, i):
-                success('wordlist {0} found: id={1}'.format(i, urls.index(i) + 1))
+        for i in files:
+            bloom = bloom_open(i, index_dir)
+            if (bloom is None or bloom_contains(bloom, item)) and contains_line(i, word, prefix):
+                success('{0} found in {1}'.format(word.decode(), i))
                 count += 1
-
         if count == 0:
-            err('no wordlist found')
+            err('{0} not found in {1} wordlists'.format(word.decode(), files.__len__()))
     except KeyboardInterrupt:
         pass
     except Exception as ex:
@@ -409,6 +1841,178 @@ def search_sites(regex):
         return -1
 
 
+def split_chunks(path):
+    import mmap
+    size = os.path.getsize(path)
+    chunks = []
+    if size <= 0:
+        return chunks
+    with open(path, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = (mm.find(b'\n', min(start + __sort_chunk__, size) - 1) + 1) or size
+            chunks.append((path, start, end))
+            start = end
+    return chunks
+
+
+def sort_chunk(path, start, end, run):
+    import mmap
+    with open(path, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        lines = sorted({i.rstrip(b'\r') + b'\n' for i in mm[start:end].split(b'\n')} - {b'\n'})
+    with open(run, 'wb') as fp:
+        fp.writelines(lines)
+    return run
+
+
+def merge_runs(runs, outfile):
+    import heapq
+    import itertools
+    fps = [open(i, 'rb', buffering=__chunk_size__) for i in runs]
+    try:
+        with open(outfile, 'wb', buffering=__chunk_size__) as fp:
+            fp.writelines(k for k, _ in itertools.groupby(heapq.merge(*fps)))
+    finally:
+        for i in fps:
+            i.close()
+    for i in runs:
+        remove(i)
+    return outfile
+
+
+def merge_wordlists(outfile):
+    import shutil
+    import tempfile
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    __start__ = time.time()
+    __tmpdir__ = None
+    try:
+        files = [i for i in installed_files() if os.path.abspath(i) != os.path.abspath(outfile)]
+        if files.__len__() <= 0:
+            raise Exception('no installed wordlists to merge')
+        info('merging {0} wordlists into {1}'.format(files.__len__(), outfile))
+        __tmpdir__ = tempfile.mkdtemp(prefix='.wordlistctl-merge-', dir=os.path.dirname(os.path.abspath(outfile)))
+        chunks = []
+        for i in files:
+            chunks.extend(split_chunks(i))
+        runs = ['{0}/{1}.run'.format(__tmpdir__, i) for i in range(chunks.__len__())]
+        with ProcessPoolExecutor(__max_procs__, multiprocessing.get_context('spawn')) as pool:
+            info('sorting {0} chunks'.format(chunks.__len__()))
+            runs = list(pool.map(sort_chunk, *zip(*chunks), runs)) if chunks.__len__() > 0 else []
+            count = runs.__len__()
+            while runs.__len__() > __merge_fanin__:
+                info('merging {0} runs'.format(runs.__len__()))
+                groups = [runs[i:i + __merge_fanin__] for i in range(0, runs.__len__(), __merge_fanin__)]
+                merged = ['{0}/{1}.run'.format(__tmpdir__, count + i) for i in range(groups.__len__())]
+                count += groups.__len__()
+                runs = list(pool.map(merge_runs, groups, merged))
+        merge_runs(runs, outfile)
+        success('merged {0} wordlists into {1} ({2} bytes) in {3:.2f}s'.format(
+            files.__len__(), outfile, os.path.getsize(outfile), time.time() - __start__))
+    except KeyboardInterrupt:
+        return -1
+    except Exception as ex:
+        err('Error while merging wordlists', str(ex))
+        return -1
+    finally:
+        if __tmpdir__ is not None:
+            shutil.rmtree(__tmpdir__, ignore_errors=True)
+
+
+def charset_table():
+    table = bytearray(b'o' * 256)
+    table[0x20:0x7f] = b's' * 0x5f
+    table[0x30:0x3a] = b'd' * 10
+    table[0x41:0x5b] = b'u' * 26
+    table[0x61:0x7b] = b'l' * 26
+    table[0x0a] = table[0x0d] = 0x0a
+    return bytes(table)
+
+
+def file_stats(path):
+    import mmap
+    import collections
+    table = charset_table()
+    lengths = collections.Counter()
+    charset = {'lower': 0, 'upper': 0, 'digit': 0, 'special': 0, 'other': 0}
+    kept = []
+    limit = None
+    lines = 0
+    chunks = split_chunks(path)
+    if chunks.__len__() > 0:
+        with open(path, 'rb') as fp, mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for _, start, end in chunks:
+                block = mm[start:end]
+                words = [i.rstrip(b'\r') for i in block.split(b'\n')]
+                if block.endswith(b'\n'):
+                    words.pop()
+                lines += words.__len__()
+                lengths.update(map(len, words))
+                hashes = map(hash, words) if limit is None else filter(limit.__gt__, map(hash, words))
+                kept = sorted(set(kept).union(hashes))[:__stats_sketch__]
+                if kept.__len__() >= __stats_sketch__:
+                    limit = kept[-1]
+                block = block.translate(table)
+                for i in charset:
+                    charset[i] += block.count(i[0].encode())
+    unique = kept.__len__()
+    if limit is not None:
+        unique = min(lines, int((__stats_sketch__ - 1) * 2.0 ** 64 / (limit + 2 ** 63 + 1)))
+    return {'lines': lines, 'bytes': os.path.getsize(path), 'unique': unique, 'estimated': limit is not None,
+            'lengths': dict([(str(k), v) for k, v in sorted(lengths.items())]), 'charset': charset}
+
+
+def print_stat(name, stats):
+    lengths = [(int(k), v) for k, v in stats['lengths'].items()]
+    chars = max(1, sum(stats['charset'].values()))
+    success("{0}:".format(name))
+    print("    > lines: {0}  bytes: {1}  unique: {2}{3} ({4:.2f}% duplicates{5})".format(
+        stats['lines'], stats['bytes'], '~' if stats.get('estimated') else '', stats['unique'],
+        100.0 * (stats['lines'] - stats['unique']) / max(1, stats['lines']),
+        ', estimated' if stats.get('estimated') else ''))
+    if lengths.__len__() > 0:
+        print("    > length: min {0}  max {1}  avg {2:.2f}".format(
+            lengths[0][0], lengths[-1][0], sum([k * v for k, v in lengths]) / max(1, stats['lines'])))
+        print("    > histogram: {0}".format(' '.join(['{0}:{1}'.format(k, v) for k, v in lengths])))
+    print("    > charset: {0}".format(' '.join(['{0} {1:.2f}%'.format(k, 100.0 * v / chars)
+                                                for k, v in stats['charset'].items()])))
+    print("")
+
+
+def print_stats():
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    try:
+        manifest = load_manifest()
+        cache = manifest.setdefault('stats', {})
+        for i in list(cache.keys()):
+            if not os.path.isfile(os.path.join(__wordlist_path__, i)):
+                cache.pop(i)
+        files = installed_files()
+        if files.__len__() <= 0:
+            raise Exception('no installed wordlists')
+        keys = [os.path.relpath(i, __wordlist_path__) for i in files]
+        stamps = [[os.stat(i).st_size, os.stat(i).st_mtime_ns] for i in files]
+        stale = [i for i in range(files.__len__()) if cache.get(keys[i], {}).get('stamp') != stamps[i]]
+        if stale.__len__() > 0:
+            info('profiling {0} wordlists\n'.format(stale.__len__()))
+            with ProcessPoolExecutor(min(__max_procs__, stale.__len__()), multiprocessing.get_context('spawn')) as pool:
+                for i, stats in zip(stale, pool.map(file_stats, [files[i] for i in stale])):
+                    stats['stamp'] = stamps[i]
+                    cache[keys[i]] = stats
+        save_manifest()
+        for i in keys:
+            print_stat(i, cache[i])
+        info('{0} wordlists: {1} lines, {2} bytes'.format(
+            keys.__len__(), sum([cache[i]['lines'] for i in keys]), sum([cache[i]['bytes'] for i in keys])))
+    except KeyboardInterrupt:
+        return -1
+    except Exception as ex:
+        err('Error while profiling wordlists', str(ex))
+        return -1
+
+
 def check_dir(dir_name):
     try:
         if os.path.isdir(dir_name):
@@ -422,7 +2026,505 @@ def check_dir(dir_name):
 
 
 def check_file(path):
-    return glob.glob("{0}*".format(str(path).split('.')[0])).__len__() > 0
+    stem = re.sub(r"\.(tar\.(gz|bz|bz2|lzma|xz)|tar|gz|bz|bz2|lzma|xz|zip|7z|rar)$", '', str(path), flags=re.I)
+    return [i for i in set([path, stem]) if i != '' and os.path.exists(i)]
+
+
+def hash_file(path, hasher=None):
+    if hasher is None:
+        hasher = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(4 * 1024 * 1024), b''):
+            hasher.update(block)
+    return hasher
+
+
+def file_digest(path):
+    return hash_file(path).hexdigest()
+
+
+def verify_wordlists():
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    try:
+        manifest = load_manifest()
+        names = [i for i in manifest['wordlists']
+                 if __category__ == '' or __index__['category'].get(i) == __category__]
+        if names.__len__() <= 0:
+            raise Exception('no installed wordlists')
+        paths = dict([(i, os.path.join(__wordlist_path__, manifest['wordlists'][i]['path'])) for i in names])
+        files = set([paths[i] for i in names if os.path.isfile(paths[i])])
+        for i in names:
+            files.update([os.path.join(__wordlist_path__, j) for j in manifest['wordlists'][i].get('digests', {})
+                          if os.path.isfile(os.path.join(__wordlist_path__, j))])
+        files = sorted(files)
+        info('verifying {0} wordlists\n'.format(names.__len__()))
+        with ProcessPoolExecutor(min(__max_procs__, max(1, files.__len__())), multiprocessing.get_context('spawn')) as pool:
+            digests = dict(zip(files, pool.map(file_digest, files)))
+        mismatched = []
+        for i in names:
+            entry = manifest['wordlists'][i]
+            missing = [j for j in entry['outputs'] if not os.path.exists(os.path.join(__wordlist_path__, j))]
+            corrupt = [j for j, k in entry.get('digests', {}).items()
+                       if os.path.join(__wordlist_path__, j) != paths[i]
+                       and digests.get(os.path.join(__wordlist_path__, j), k) != k]
+            expected = __urls__.get(i, {}).get('sha256', '').lower() or entry.get('sha256')
+            if missing.__len__() > 0:
+                err('{0} is missing {1}'.format(i, ', '.join(missing)))
+                mismatched.append(i)
+            elif corrupt.__len__() > 0:
+                err('{0} checksum mismatch in {1}'.format(i, ', '.join(corrupt)))
+                mismatched.append(i)
+            elif paths[i] in digests and expected is not None and digests[paths[i]] != expected:
+                err('{0} checksum mismatch'.format(i))
+                mismatched.append(i)
+            elif paths[i] not in digests and entry.get('digests', {}).__len__() <= 0:
+                warn('{0} cannot be verified, {1} was removed'.format(i, entry['path']))
+            else:
+                if paths[i] in digests:
+                    entry['sha256'] = digests[paths[i]]
+                success('{0} ok'.format(i))
+        print("")
+        if mismatched.__len__() <= 0:
+            save_manifest()
+            return 0
+        return refetch_wordlists(mismatched, 'corrupt')
+    except KeyboardInterrupt:
+        return -1
+    except Exception as ex:
+        err('Error while verifying wordlists', str(ex))
+        return -1
+
+
+def load_manifest():
+    global __manifest__
+    __manifest_file_name__ = "{0}/.wordlistctl-manifest.json".format(__wordlist_path__)
+    if __manifest__.get('file') != __manifest_file_name__:
+        manifest = {'file': __manifest_file_name__, 'version': 1, 'wordlists': {}}
+        if os.path.isfile(__manifest_file_name__):
+            manifest.update(load_json(__manifest_file_name__))
+        manifest['file'] = __manifest_file_name__
+        __manifest__ = manifest
+    return __manifest__
+
+
+def save_manifest():
+    if __manifest__.get('file') is None:
+        return
+    try:
+        with open("{0}.tmp".format(__manifest__['file']), 'w') as fp:
+            json.dump(dict([i for i in __manifest__.items() if i[0] != 'file']), fp, indent=1)
+        os.replace("{0}.tmp".format(__manifest__['file']), __manifest__['file'])
+    except Exception as ex:
+        err('unable to save {0}'.format(__manifest__['file']), str(ex))
+
+
+def installed_outputs(name, path):
+    entry = load_manifest()['wordlists'].get(name)
+    if entry is None:
+        return []
+    return [i for i in entry['outputs'] if os.path.join(__wordlist_path__, i) != os.path.abspath(path)]
+
+
+def installed(name, path):
+    manifest = load_manifest()
+    entry = manifest['wordlists'].get(name)
+    if entry is not None:
+        for i in [entry['path']] + entry['outputs']:
+            if os.path.exists(os.path.join(__wordlist_path__, i)):
+                return True
+        with __lock__:
+            manifest['wordlists'].pop(name, None)
+    files = check_file(path) if path != '' else []
+    if files.__len__() > 0 and name != '':
+        record_install(name, __urls__.get(name, {}).get('http', ''), path, None, files)
+    return files.__len__() > 0
+
+
+def record_install(name, url, path, digest, outputs=None):
+    if name == '':
+        return
+    if outputs is None:
+        outputs = {path: digest}
+    elif not isinstance(outputs, dict):
+        outputs = dict([(i, None) for i in outputs])
+    stat = os.stat(path) if os.path.exists(path) else os.stat(list(outputs)[0])
+    entry = {'url': url, 'path': os.path.relpath(path, __wordlist_path__), 'size': stat.st_size,
+             'mtime': stat.st_mtime, 'sha256': digest,
+             'outputs': [os.path.relpath(i, __wordlist_path__) for i in outputs],
+             'digests': dict([(os.path.relpath(i, __wordlist_path__), j) for i, j in outputs.items() if j])}
+    manifest = load_manifest()
+    with __lock__:
+        manifest['wordlists'][name] = entry
+    if __serve__ != '':
+        store_object(path, digest)
+
+
+def record_outputs(name, path, outputs):
+    manifest = load_manifest()
+    with __lock__:
+        entry = manifest['wordlists'].get(name)
+        if entry is not None and outputs:
+            entry['outputs'] = [os.path.relpath(i, __wordlist_path__) for i in outputs]
+            entry['digests'] = dict([(os.path.relpath(i, __wordlist_path__), j) for i, j in outputs.items() if j])
+
+
+def mirror_path():
+    return "{0}/.wordlistctl-mirror".format(__wordlist_path__)
+
+
+def store_object(path, digest):
+    import shutil
+    __object__ = "{0}/{1}".format(mirror_path(), digest)
+    if digest is None or not os.path.isfile(path) or os.path.isfile(__object__):
+        return
+    os.makedirs(mirror_path(), exist_ok=True)
+    try:
+        os.link(path, "{0}.tmp".format(__object__))
+    except OSError:
+        shutil.copyfile(path, "{0}.tmp".format(__object__))
+    os.replace("{0}.tmp".format(__object__), __object__)
+
+
+def mirror_objects():
+    objects = {}
+    for name, entry in load_manifest()['wordlists'].items():
+        if entry.get('sha256') is None:
+            continue
+        try:
+            store_object(os.path.join(__wordlist_path__, entry['path']), entry['sha256'])
+        except OSError as ex:
+            err('unable to mirror {0}'.format(name), str(ex))
+        __object__ = "{0}/{1}".format(mirror_path(), entry['sha256'])
+        if os.path.isfile(__object__):
+            objects[name] = {'sha256': entry['sha256'], 'filename': os.path.basename(entry['path']),
+                             'size': os.path.getsize(__object__)}
+    return objects
+
+
+def mirror_respond(handler, objects, body):
+    import urllib.parse
+    path = urllib.parse.unquote(handler.path.split('?')[0]).strip('/')
+    if path == '':
+        data = json.dumps(objects).encode()
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(data.__len__()))
+        handler.end_headers()
+        if body:
+            handler.wfile.write(data)
+        return
+    if path in objects:
+        handler.send_response(302)
+        handler.send_header('Location', '/objects/{0}/{1}'.format(
+            objects[path]['sha256'], urllib.parse.quote(objects[path]['filename'])))
+        handler.send_header('Content-Length', '0')
+        handler.end_headers()
+        return
+    match = re.fullmatch(r"objects/([0-9a-f]{64})(/[^/]+)?", path)
+    __object__ = "{0}/{1}".format(mirror_path(), match.group(1)) if match else ''
+    if not os.path.isfile(__object__):
+        handler.send_error(404)
+        return
+    etag = '"{0}"'.format(match.group(1))
+    size = os.path.getsize(__object__)
+    start, end = 0, size - 1
+    match = re.fullmatch(r"bytes=(\d+)-(\d*)", handler.headers.get('Range', ''))
+    if match and handler.headers.get('If-Range', etag) == etag:
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        if start >= size or start > end:
+            handler.send_response(416)
+            handler.send_header('Content-Range', 'bytes */{0}'.format(size))
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+        handler.send_response(206)
+        handler.send_header('Content-Range', 'bytes {0}-{1}/{2}'.format(start, end, size))
+    else:
+        handler.send_response(200)
+    handler.send_header('Content-Type', 'application/octet-stream')
+    handler.send_header('Content-Length', str(end - start + 1))
+    handler.send_header('Accept-Ranges', 'bytes')
+    handler.send_header('ETag', etag)
+    handler.end_headers()
+    if not body:
+        return
+    with open(__object__, 'rb') as fp:
+        offset, remaining = start, end - start + 1
+        while remaining > 0:
+            sent = os.sendfile(handler.connection.fileno(), fp.fileno(), offset, remaining)
+            if sent <= 0:
+                break
+            offset += sent
+            remaining -= sent
+
+
+def serve_mirror(address):
+    import http.server
+    host, _, port = address.rpartition(':')
+    host = host or '0.0.0.0'
+    objects = mirror_objects()
+
+    class MirrorHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            info("{0} - {1}".format(self.address_string(), format % args))
+
+        def do_HEAD(self):
+            mirror_respond(self, objects, False)
+
+        def do_GET(self):
+            mirror_respond(self, objects, True)
+
+    server = http.server.ThreadingHTTPServer((host, to_int(port)), MirrorHandler)
+    server.daemon_threads = True
+    success("serving {0} wordlists on http://{1}:{2}/".format(objects.__len__(), host, server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+class Wordlistctl(object):
+    """
+    library api. options are given by their global name without underscores,
+    e.g. Wordlistctl(wordlist_path='/tmp/wordlists', decompress=True, max_trds=20).
+    the catalog, http pool and torrent session stay loaded between calls.
+
+    the state still lives in the module globals, so a process has one effective
+    instance: calls from all instances run one at a time, each with its own
+    options applied. cancel() and status() may be called from any thread and
+    only act on a call of the same instance.
+    """
+
+    def __init__(self, base='', **options):
+        global __keep_torrents__
+        global __api_defaults__
+        global __api_instances__
+        for key in options:
+            if '__{0}__'.format(key) not in __options__:
+                raise ValueError('unknown option {0}'.format(key))
+        with __api_lock__:
+            if __api_defaults__ is None:
+                __api_defaults__ = dict([(i, globals()[i]) for i in __options__])
+            __api_instances__ += 1
+            __keep_torrents__ = True
+        self.base = base or os.path.dirname(os.path.realpath(__file__))
+        self.options = options
+        self.cancelled = False
+        self.closed = False
+
+    def prepare(self):
+        global __urls__
+        global __categories__
+        global __manifest__
+        global __metrics__
+        global __results__
+        global __cancel__
+        global __api_stamps__
+        globals().update(__api_defaults__)
+        globals().update([('__{0}__'.format(i[0]), i[1]) for i in self.options.items()])
+        init_paths(self.base)
+        try:
+            stamps = (self.base, config_stamps())
+        except OSError:
+            stamps = None
+        if stamps != __api_stamps__:
+            __urls__ = {}
+            __categories__ = {}
+            __api_stamps__ = stamps
+        __manifest__ = {}
+        __metrics__ = {}
+        __results__ = []
+        __cancel__ = threading.Event()
+        if __session__ is not None:
+            __session__.apply_settings(torrent_settings())
+
+    def call(self, func, *args):
+        global __api_owner__
+        with __api_lock__:
+            self.prepare()
+            with __lock__:
+                __api_owner__ = self
+                self.cancelled = False
+            try:
+                return func(*args)
+            except SystemExit:
+                return -1
+            finally:
+                with __lock__:
+                    __api_owner__ = None
+                globals().update(__api_defaults__)
+
+    def run(self, argv):
+        def operation():
+            __operation__, __arg__ = arg_parse(['wordlistctl'] + list(argv))
+            if __operation__ is serve_daemon or __serve__ != '':
+                err("Error while running operation", '-D and -E are not available here')
+                return -1
+            return run_operation(__operation__, __arg__)
+        return self.call(operation)
+
+    def download(self, names):
+        def operation():
+            load_config()
+            unknown = [i for i in names if i not in __urls__]
+            if unknown.__len__() > 0:
+                err("Error unable to download wordlist", 'unknown wordlists {0}'.format(', '.join(unknown)))
+                return -1
+            check_dir(__wordlist_path__)
+            return download_names(list(names))
+        return self.call(operation)
+
+    def search(self, query):
+        def operation():
+            load_config(urls=False)
+            return [__index__['names'][i[1] - 1] for i in rank_names(query, scope_ids())]
+        return self.call(operation)
+
+    def installed(self):
+        return self.call(lambda: dict(load_manifest()['wordlists']))
+
+    def status(self):
+        with __lock__:
+            running = __api_owner__ is self
+            return {'running': running, 'cancelled': self.cancelled,
+                    'torrents': __torrents__.__len__() if running else 0,
+                    'transfers': dict([(os.path.basename(i[0]), {'bytes': i[1]['bytes'], 'total': i[1]['total']})
+                                       for i in __metrics__.items() if running and i[1].get('active')])}
+
+    def cancel(self):
+        with __lock__:
+            if __api_owner__ is not self:
+                return
+            self.cancelled = True
+            __cancel__.set()
+        join_torrents(cancel=True)
+
+    def close(self):
+        global __keep_torrents__
+        global __api_instances__
+        with __api_lock__:
+            if self.closed:
+                return
+            self.closed = True
+            __api_instances__ -= 1
+            if __api_instances__ <= 0:
+                __keep_torrents__ = False
+                close_torrents()
+
+
+def daemon_request(api, jobs, pending, request):
+    op = request.get('op')
+    if op == 'submit':
+        args = request.get('args')
+        if not isinstance(args, list) or not all([isinstance(i, str) for i in args]):
+            raise ValueError('args must be a list of strings')
+        with __lock__:
+            job = {'id': jobs.__len__() + 1, 'args': args, 'state': 'queued', 'result': None,
+                   'submitted': time.time(), 'output': None}
+            jobs[job['id']] = job
+        pending.put(job)
+        return {'id': job['id'], 'state': job['state']}
+    elif op == 'status':
+        if request.get('id') is None:
+            return {'jobs': [dict([i for i in job.items() if i[0] != 'output']) for job in list(jobs.values())],
+                    'status': api.status()}
+        job = jobs[int(request['id'])]
+        return dict(job, output=job['output'].getvalue() if job['output'] is not None else '')
+    elif op == 'cancel':
+        job = jobs[int(request['id'])]
+        with __lock__:
+            if job['state'] == 'queued':
+                job['state'] = 'cancelled'
+            elif job['state'] == 'running':
+                api.cancel()
+            return {'id': job['id'], 'state': job['state']}
+    raise ValueError('unknown op {0}'.format(op))
+
+
+def daemon_jobs(api, pending):
+    import contextlib
+    import io
+    while True:
+        job = pending.get()
+        if job is None:
+            break
+        with __lock__:
+            if job['state'] != 'queued':
+                continue
+            job['state'] = 'running'
+            job['started'] = time.time()
+            job['output'] = io.StringIO()
+        info("running job {0}: {1}".format(job['id'], ' '.join(job['args'])))
+        with contextlib.redirect_stdout(job['output']), contextlib.redirect_stderr(job['output']):
+            try:
+                job['result'] = api.run(job['args'])
+            except Exception as ex:
+                err("Error while running job", str(ex))
+                job['result'] = -1
+        with __lock__:
+            job['finished'] = time.time()
+            job['state'] = 'cancelled' if api.status()['cancelled'] else 'done' if job['result'] == 0 else 'failed'
+        info("job {0} {1}".format(job['id'], job['state']))
+
+
+def stop_daemon(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve_daemon(address):
+    import signal
+    import socket
+    import socketserver
+    import stat
+    api = Wordlistctl()
+    jobs = {}
+    pending = queue.Queue()
+
+    class DaemonHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if line.strip() == b'':
+                    continue
+                try:
+                    response = daemon_request(api, jobs, pending, json.loads(line))
+                except Exception as ex:
+                    response = {'error': str(ex)}
+                self.wfile.write("{0}\n".format(json.dumps(response)).encode())
+                self.wfile.flush()
+
+    if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+        with socket.socket(socket.AF_UNIX) as probe:
+            try:
+                probe.connect(address)
+                raise IOError('{0} is in use by another daemon'.format(address))
+            except ConnectionRefusedError:
+                os.remove(address)
+    server = socketserver.ThreadingUnixStreamServer(address, DaemonHandler)
+    server.daemon_threads = True
+    os.chmod(address, 0o600)
+    runner = threading.Thread(target=daemon_jobs, args=(api, pending), daemon=True)
+    runner.start()
+    signal.signal(signal.SIGTERM, stop_daemon)
+    info("accepting jobs on {0}".format(address))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(address)
+        api.cancel()
+        pending.put(None)
+        runner.join()
+        api.close()
+    return 0
 
 
 def load_json(infilename):
@@ -438,7 +2540,7 @@ def change_category(code):
     global __categories__
     __category_id__ = 0
     if __categories__.__len__() <= 0:
-        load_config()
+        load_config(urls=False)
 
     __category_id__ = to_int(code)
 
@@ -460,37 +2562,207 @@ def print_categories():
     print("")
 
 
+def fetch_config(url, path, state):
+    filename = os.path.basename(path)
+    headers = {}
+    if os.path.isfile(path):
+        if state.get(filename, {}).get('etag'):
+            headers['If-None-Match'] = state[filename]['etag']
+        if state.get(filename, {}).get('last_modified'):
+            headers['If-Modified-Since'] = state[filename]['last_modified']
+    rq = http_session().get(url, headers=headers, timeout=__timeout__)
+    if rq.status_code == 304:
+        info("{0} is up to date".format(filename))
+        return False
+    rq.raise_for_status()
+    state[filename] = {'etag': rq.headers.get('ETag', ''), 'last_modified': rq.headers.get('Last-Modified', '')}
+    if os.path.isfile(path) and os.path.getsize(path) == rq.content.__len__():
+        with open(path, 'rb') as fp:
+            if fp.read() == rq.content:
+                info("{0} is up to date".format(filename))
+                return False
+    with open("{0}.tmp".format(path), 'wb') as fp:
+        fp.write(rq.content)
+    os.replace("{0}.tmp".format(path), path)
+    success("{0} updated ({1} bytes)".format(filename, rq.content.__len__()))
+    return True
+
+
+def diff_catalog(old, new):
+    added = [i for i in new if i not in old]
+    removed = [i for i in old if i not in new]
+    changed = [i for i in new if i in old and old[i] != new[i]]
+    return added, removed, changed
+
+
 def update_config():
     global __urls__
     global __categories__
-    __base_url__ = 'https://raw.githubusercontent.com/BlackArch/wordlistctl/master'
     files = [__urls_file_name__, __categories_file_name__]
     try:
         info('updating config files\n')
-        for i in files:
-            if os.path.isfile(i):
-                remove(i)
-            fetch_file('{0}/{1}'.format(__base_url__, os.path.basename(i)), i)
-        for i in __trds__:
-            i.join()
+        old = load_json(__urls_file_name__) if os.path.isfile(__urls_file_name__) else {}
+        state = load_json(__state_file_name__) if os.path.isfile(__state_file_name__) else {}
+        updated = [fetch_config('{0}/{1}'.format(__config_url__, os.path.basename(i)), i, state) for i in files]
+        with open(__state_file_name__, 'w') as fp:
+            json.dump(state, fp)
+        __urls__ = {}
+        __categories__ = {}
         load_config()
+        if True in updated:
+            added, removed, changed = diff_catalog(old, __urls__)
+            info("catalog changes: {0} added, {1} removed, {2} changed".format(
+                added.__len__(), removed.__len__(), changed.__len__()))
+            for sign, names in [('+', added), ('-', removed), ('~', changed)]:
+                for i in names:
+                    print("    {0} {1}".format(sign, i))
+            if __fetch_changed__ and refetch_wordlists(changed) == -1:
+                raise Exception('unable to refetch changed wordlists')
         success('updating config files completed')
     except Exception as ex:
         err('Error while updating', str(ex))
         exit(-1)
 
 
-def load_config():
+def refetch_wordlists(names, reason='changed'):
+    global __decompress__
+    global __remove__
+    manifest = load_manifest()
+    names = [i for i in names if i in manifest['wordlists']]
+    if names.__len__() <= 0:
+        info('no installed wordlist has changed')
+        return 0
+    previous = {}
+    groups = {}
+    for i in names:
+        entry = manifest['wordlists'].pop(i)
+        moved = []
+        for j in set([entry['path']] + entry['outputs']):
+            path = os.path.join(__wordlist_path__, j)
+            if os.path.exists(path):
+                os.replace(path, "{0}.old".format(path))
+                moved.append(path)
+        previous[i] = (entry, moved)
+        extracted = entry['outputs'] != [entry['path']]
+        archived = os.path.join(__wordlist_path__, entry['path']) in moved
+        groups.setdefault((__decompress__ or extracted, __remove__ or (extracted and not archived)), []).append(i)
+    info('refetching {0} {1} wordlists'.format(names.__len__(), reason))
+    result = 0
+    decompress, clean_up = __decompress__, __remove__
+    try:
+        for (__decompress__, __remove__), group in groups.items():
+            if download_names(group) == -1:
+                result = -1
+    finally:
+        __decompress__, __remove__ = decompress, clean_up
+    manifest = load_manifest()
+    for i, (entry, moved) in previous.items():
+        current = manifest['wordlists'].get(i)
+        if current is not None and (entry['outputs'] == [entry['path']] or current['outputs'] != [current['path']]):
+            for path in moved:
+                remove("{0}.old".format(path))
+            continue
+        warn('keeping the previous {0}'.format(i))
+        for path in moved:
+            os.replace("{0}.old".format(path), path)
+        manifest['wordlists'][i] = entry
+        result = -1
+    save_manifest()
+    return result
+
+
+def build_index(names=None):
+    global __index__
+    if names is None:
+        names = list(__urls__.keys())
+    ids = {name: i for i, name in enumerate(names, 1)}
+    __index__ = {'names': names, 'ids': ids, 'category': {}, 'categories': {}}
+    for i in __categories__:
+        __index__['categories'][i] = [ids[j] for j in __categories__[i] if j in ids]
+        for j in __categories__[i]:
+            __index__['category'][j] = i
+
+
+def scope_ids():
+    if __category__ != '':
+        return __index__['categories'][__category__]
+    return range(1, __index__['names'].__len__() + 1)
+
+
+def config_stamps():
+    return tuple((os.stat(i).st_mtime_ns, os.stat(i).st_size) for i in [__urls_file_name__, __categories_file_name__])
+
+
+def load_cache(urls=True):
+    global __urls__
+    global __categories__
+    try:
+        with open(__cache_file_name__, 'rb') as fp:
+            magic, version, length, search = struct.unpack('<4sIII', fp.read(16))
+            if magic != b'WLCC' or version != __cache_version__:
+                return False
+            stamps, names, categories = marshal.loads(fp.read(length))
+            if stamps != config_stamps():
+                return False
+            if urls:
+                fp.seek(search, 1)
+                __urls__ = marshal.loads(fp.read())
+        __categories__ = categories
+        build_index(names)
+        return True
+    except:
+        return False
+
+
+def load_search():
+    try:
+        with open(__cache_file_name__, 'rb') as fp:
+            magic, version, length, search = struct.unpack('<4sIII', fp.read(16))
+            if magic != b'WLCC' or version != __cache_version__:
+                return False
+            fp.seek(length, 1)
+            stamps, index, grams, text = marshal.loads(fp.read(search))
+            if stamps != config_stamps() or grams.__len__() != __index__['names'].__len__():
+                return False
+        __index__['trigrams'] = index
+        __index__['grams'] = grams
+        __index__['text'] = text
+        return True
+    except:
+        return False
+
+
+def save_cache():
+    try:
+        if 'trigrams' not in __index__:
+            build_search()
+        index = marshal.dumps((config_stamps(), __index__['names'], __categories__))
+        search = marshal.dumps((config_stamps(), __index__['trigrams'], __index__['grams'], __index__['text']))
+        with open("{0}.tmp".format(__cache_file_name__), 'wb') as fp:
+            fp.write(struct.pack('<4sIII', b'WLCC', __cache_version__, index.__len__(), search.__len__()))
+            fp.write(index)
+            fp.write(search)
+            fp.write(marshal.dumps(__urls__))
+        os.replace("{0}.tmp".format(__cache_file_name__), __cache_file_name__)
+    except:
+        remove("{0}.tmp".format(__cache_file_name__))
+
+
+def load_config(urls=True):
     global __urls__
     global __categories__
     files = [__urls_file_name__, __categories_file_name__]
-    if __urls__.__len__() <= 0 or __categories__.__len__() <= 0:
+    if __categories__.__len__() <= 0 or (urls and __urls__.__len__() <= 0):
         try:
             for i in files:
                 if not os.path.isfile(i):
                     raise FileNotFoundError('Config files not found please update')
+            if load_cache(urls):
+                return
             __urls__ = load_json(__urls_file_name__)
             __categories__ = load_json(__categories_file_name__)
+            build_index()
+            save_cache()
         except Exception as ex:
             err('Error while loading config files', str(ex))
             exit(-1)
@@ -510,19 +2782,32 @@ def arg_parse(argv):
     global __remove__
     global __prefer_http__
     global __max_trds__
+    global __chunk_size__
+    global __segments__
+    global __async__
+    global __max_procs__
+    global __rate_limit__
+    global __write_limit__
+    global __progress__
+    global __metrics_file__
+    global __mirror_url__
+    global __install_filter__
+    global __serve__
+    global __fetch_changed__
+    global __index_contents__
     __operation__ = None
     __arg__ = None
     opFlag = 0
 
     try:
-        opts, _ = getopt.getopt(argv[1:], "HVUXhrd:c:f:s:S:t:F:")
+        opts, _ = getopt.getopt(argv[1:], "HVUXhruIiPvd:c:f:s:S:t:F:b:j:a:p:w:M:L:W:m:R:E:l:D:")
 
         if opts.__len__() <= 0:
             __operation__ = usage
             return __operation__, None
 
         for opt, arg in opts:
-            if opFlag and re.fullmatch(r"^-([VfsSUF])", opt):
+            if opFlag and re.fullmatch(r"^-([VfsSUFwMivD])", opt):
                 raise getopt.GetoptError("multiple operations selected")
             if opt == '-H':
                 __operation__ = usage
@@ -552,6 +2837,24 @@ def arg_parse(argv):
             elif opt == '-U':
                 __operation__ = update_config
                 opFlag += 1
+            elif opt == '-u':
+                __fetch_changed__ = True
+            elif opt == '-I':
+                __index_contents__ = True
+            elif opt == '-w':
+                __operation__ = search_words
+                __arg__ = arg
+                opFlag += 1
+            elif opt == '-v':
+                __operation__ = verify_wordlists
+                opFlag += 1
+            elif opt == '-i':
+                __operation__ = print_stats
+                opFlag += 1
+            elif opt == '-M':
+                __operation__ = merge_wordlists
+                __arg__ = arg
+                opFlag += 1
             elif opt == '-S':
                 __operation__ = search_sites
                 __arg__ = arg
@@ -568,6 +2871,46 @@ def arg_parse(argv):
                 __max_trds__ = to_int(arg)
                 if __max_trds__ <= 0:
                     raise Exception("threads number can't be less than 1")
+            elif opt == '-b':
+                __chunk_size__ = to_int(arg) * 1024
+                if __chunk_size__ <= 0:
+                    raise Exception("chunk size can't be less than 1")
+            elif opt == '-j':
+                __segments__ = to_int(arg)
+                if __segments__ <= 0:
+                    raise Exception("connections number can't be less than 1")
+            elif opt == '-a':
+                __async__ = to_int(arg)
+                if __async__ <= 0:
+                    raise Exception("connections number can't be less than 1")
+            elif opt == '-p':
+                __max_procs__ = to_int(arg)
+                if __max_procs__ <= 0:
+                    raise Exception("processes number can't be less than 1")
+            elif opt == '-P':
+                __progress__ = True
+            elif opt == '-m':
+                __metrics_file__ = arg
+            elif opt == '-l':
+                if arg not in ['installed', 'missing']:
+                    raise Exception("install state must be installed or missing")
+                __install_filter__ = arg
+            elif opt == '-R':
+                __mirror_url__ = arg
+            elif opt == '-E':
+                __serve__ = arg
+            elif opt == '-D':
+                __operation__ = serve_daemon
+                __arg__ = arg
+                opFlag += 1
+            elif opt == '-L':
+                __rate_limit__ = to_int(arg)
+                if __rate_limit__ <= 0:
+                    raise Exception("rate limit can't be less than 1")
+            elif opt == '-W':
+                __write_limit__ = to_int(arg)
+                if __write_limit__ <= 0:
+                    raise Exception("write limit can't be less than 1")
             elif opt == '-F':
                 __operation__ = print_wordlists
                 __arg__ = arg
@@ -582,27 +2925,39 @@ def arg_parse(argv):
     return __operation__, __arg__
 
 
-def main(argv):
+def init_paths(__base_name__):
     global __urls_file_name__
     global __categories_file_name__
-    banner()
-    __base_name__ = os.path.dirname(os.path.realpath(__file__))
+    global __cache_file_name__
+    global __state_file_name__
+    global __resolve_file_name__
+    global __sizes_file_name__
     __urls_file_name__ = '{0}/urls.json'.format(__base_name__)
     __categories_file_name__ = '{0}/categories.json'.format(__base_name__)
+    __cache_file_name__ = '{0}/catalog.cache'.format(__base_name__)
+    __state_file_name__ = '{0}/catalog.state.json'.format(__base_name__)
+    __resolve_file_name__ = '{0}/mediafire.json'.format(__base_name__)
+    __sizes_file_name__ = '{0}/sizes.json'.format(__base_name__)
 
-    __operation__, __arg__ = arg_parse(argv)
 
+def run_operation(__operation__, __arg__):
     try:
-        if __operation__ not in [update_config, version, usage]:
+        if __operation__ in [print_wordlists, print_categories, search_sites, search_words, merge_wordlists,
+                             print_stats]:
+            load_config(urls=False)
+        elif __operation__ not in [update_config, version, usage, search_dir, serve_daemon, None]:
             load_config()
+        __result__ = 0
         if __operation__ is not None:
             if __arg__ is not None:
-                __operation__(__arg__)
+                __result__ = __operation__(__arg__)
             else:
-                __operation__()
-        else:
+                __result__ = __operation__()
+        elif __serve__ == '':
             raise getopt.GetoptError("no operation selected")
-        return 0
+        if __serve__ != '':
+            return serve_mirror(__serve__)
+        return -1 if __result__ == -1 else 0
     except getopt.GetoptError as ex:
         err("Error while running operation", str(ex))
         warn("-H for help and usage")
@@ -612,28 +2967,12 @@ def main(argv):
         return -1
 
 
-if __name__ == '__main__':
-    try:
-        import sys
-        import os
-        import getopt
-        import requests
-        import glob
-        import re
-        import threading
-        import libtorrent
-        import libarchive
-        import time
-        import gzip
-        import bz2
-        import lzma
-        import rarfile
-        from shutil import copyfileobj
-        import json
-        from bs4 import BeautifulSoup
-        from termcolor import colored
-    except Exception as ex:
-        err("Error while loading dependencies", str(ex))
-        exit(-1)
+def main(argv):
+    banner()
+    init_paths(os.path.dirname(os.path.realpath(__file__)))
+    __operation__, __arg__ = arg_parse(argv)
+    return run_operation(__operation__, __arg__)
 
+
+if __name__ == '__main__':
     sys.exit(main(sys.argv))